@@ -28,14 +28,32 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Modo de medición: tiempo de consultas y de render por separado (cabecera Server-Timing)
+MEDIR_RENDER = config('MEDIR_RENDER', default=False, cast=bool)
+if MEDIR_RENDER:
+    MIDDLEWARE.insert(0, 'reservas.middleware.MedicionRenderMiddleware')
+
+# Servir STATIC_ROOT desde Django cuando no hay un servidor web delante
+SERVIR_ESTATICOS = config('SERVIR_ESTATICOS', default=False, cast=bool)
+if SERVIR_ESTATICOS:
+    MIDDLEWARE.insert(1, 'reservas.middleware.EstaticosMiddleware')
+
 ROOT_URLCONF = 'biblioteca.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # ← Esta línea es crucial
-        'APP_DIRS': True,
         'OPTIONS': {
+            # En producción las plantillas se compilan una sola vez por proceso
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -60,6 +78,18 @@ DATABASES = {
     }
 }
 
+# Caché: en despliegues con varios procesos debe ser compartida (p. ej. Redis),
+# ya que guarda las versiones usadas por las peticiones condicionales
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # Versiones y tarjetas de salas: una entrada por sala, más de las 300 por defecto
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=20000, cast=int)}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -85,9 +115,48 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+# Modo producción de estáticos (opcional, requiere collectstatic en cada despliegue):
+# nombres con hash y variantes .gz/.br generadas por collectstatic
+# (las .br requieren el paquete brotli de requirements.txt; sin él solo se generan .gz)
+ESTATICOS_COMPRIMIDOS = config('ESTATICOS_COMPRIMIDOS', default=False, cast=bool)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'reservas.almacenamiento.AlmacenamientoComprimido' if ESTATICOS_COMPRIMIDOS
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Configuración para el login personalizado
 LOGIN_URL = '/administracion/login/'
 LOGIN_REDIRECT_URL = '/administracion/panel/'
-LOGOUT_REDIRECT_URL = '/administracion/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/administracion/login/'
+
+# Ventana móvil publicada en los calendarios iCalendar
+CALENDARIO_DIAS_ATRAS = config('CALENDARIO_DIAS_ATRAS', default=30, cast=int)
+CALENDARIO_DIAS_ADELANTE = config('CALENDARIO_DIAS_ADELANTE', default=90, cast=int)
+# Auditoría: eventos en cola y escritos en lotes por un hilo en segundo plano
+AUDITORIA_MAX_COLA = config('AUDITORIA_MAX_COLA', default=10000, cast=int)
+AUDITORIA_LOTE = config('AUDITORIA_LOTE', default=100, cast=int)
+AUDITORIA_INTERVALO_MS = config('AUDITORIA_INTERVALO_MS', default=500, cast=int)
+# Pronóstico de ocupación: se guarda en la tabla pronosticos (comando calcular_pronostico)
+# y cada proceso lo mantiene en caché este tiempo
+PRONOSTICO_CACHE_SEGUNDOS = config('PRONOSTICO_CACHE_SEGUNDOS', default=900, cast=int)
+# Reservas confirmadas en lotes por un único hilo (group commit) en horas punta.
+# La cola es por proceso: requiere workers con varios hilos (gunicorn --threads) o ASGI;
+# con workers síncronos de un hilo cada lote tendría una sola reserva.
+RESERVAS_COMMIT_AGRUPADO = config('RESERVAS_COMMIT_AGRUPADO', default=False, cast=bool)
+RESERVAS_MAX_COLA = config('RESERVAS_MAX_COLA', default=1000, cast=int)
+RESERVAS_LOTE = config('RESERVAS_LOTE', default=200, cast=int)
+RESERVAS_VENTANA_MS = config('RESERVAS_VENTANA_MS', default=2, cast=int)
+RESERVAS_ESPERA_SEGUNDOS = config('RESERVAS_ESPERA_SEGUNDOS', default=10, cast=int)
+
+
+# Instantánea estática para kioscos y pantallas (servida por el servidor web)
+INSTANTANEA_ACTIVA = config('INSTANTANEA_ACTIVA', default=True, cast=bool)
+INSTANTANEA_DIR = config('INSTANTANEA_DIR', default=str(BASE_DIR / 'instantanea'))
+INSTANTANEA_URL = '/kiosco/'
+INSTANTANEA_AGRUPAR_SEGUNDOS = config('INSTANTANEA_AGRUPAR_SEGUNDOS', default=1, cast=float)
+INSTANTANEA_ESPERA_MAXIMA = config('INSTANTANEA_ESPERA_MAXIMA', default=3600, cast=int)
\ No newline at end of file
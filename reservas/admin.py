@@ -1,38 +1,231 @@
+import json
+
 from django.contrib import admin
-from .models import Sala, Reserva
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+from .auditoria import datos_reserva, datos_sala, registrar_evento
+from .models import Sala, Reserva, Sede, PerfilStaff
+from .versiones import registrar_cambio
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginador que no hace un COUNT(*) exacto sobre tablas grandes: sin filtros usa
+    las estadísticas de PostgreSQL (pg_class), con filtros la estimación de filas
+    de EXPLAIN, y en otros motores cuenta como máximo hasta el umbral
+    """
+    umbral = 100000
+
+    def _estimacion_postgresql(self, queryset, conexion):
+        with conexion.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table],
+                )
+                fila = cursor.fetchone()
+                return fila[0] if fila else None
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, models.QuerySet):
+            return super().count
+        conexion = connections[queryset.db]
+        if conexion.vendor == 'postgresql':
+            estimacion = self._estimacion_postgresql(queryset, conexion)
+            if estimacion is not None and estimacion > self.umbral:
+                return estimacion
+        # Conteo exacto acotado: nunca recorre más de umbral + 1 filas
+        return queryset.order_by().values('pk')[:self.umbral + 1].count()
+
+
+class FiltroSedeMixin:
+    """
+    Limita el listado y los formularios del admin a la sede del perfil del
+    funcionario; los superusuarios ven todas las sedes
+    """
+
+    def sede_del_usuario(self, request):
+        if not hasattr(request, '_sede_admin'):
+            perfil = PerfilStaff.objects.filter(usuario=request.user).first()
+            request._sede_admin = perfil.sede_id if perfil else None
+        return request._sede_admin
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        sede_id = self.sede_del_usuario(request)
+        if sede_id is None:
+            return queryset.none()
+        return queryset.filter(sede_id=sede_id)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if not request.user.is_superuser:
+            sede_id = self.sede_del_usuario(request)
+            if db_field.name == 'sede':
+                kwargs['queryset'] = Sede.objects.filter(id=sede_id)
+            elif db_field.name == 'sala':
+                kwargs['queryset'] = Sala.objects.filter(sede_id=sede_id)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class FiltroRelacionSede(admin.RelatedFieldListFilter):
+    """
+    Filtro por sede o sala que al personal solo le ofrece las de su sede
+    """
+
+    def field_choices(self, field, request, model_admin):
+        if request.user.is_superuser:
+            return super().field_choices(field, request, model_admin)
+        sede_id = model_admin.sede_del_usuario(request)
+        filtro = {'id': sede_id} if field.related_model is Sede else {'sede_id': sede_id}
+        return field.get_choices(
+            include_blank=False,
+            limit_choices_to=filtro,
+            ordering=self.field_admin_ordering(field, request, model_admin),
+        )
+
+
+class SoloSuperusuarioMixin:
+    """
+    Sedes y perfiles definen qué ve cada funcionario: solo los administra un superusuario
+    """
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return request.user.is_superuser
+
+    def has_change_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+
+class AuditoriaAdminMixin:
+    """
+    Registra en la auditoría lo que se crea, edita o elimina desde el admin,
+    incluidas las ediciones en la lista (list_editable)
+    """
+    acciones_auditoria = {}
+    datos_auditoria = None
+
+    def save_model(self, request, obj, form, change):
+        antes = None
+        if change:
+            antes = self.datos_auditoria(type(obj).objects.get(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        registrar_evento(request.user.username, self.acciones_auditoria['editar' if change else 'crear'],
+                         obj, antes=antes, despues=self.datos_auditoria(obj))
+
+    # El evento se encola antes de eliminar: delete() deja obj.pk en None
+    def delete_model(self, request, obj):
+        registrar_evento(request.user.username, self.acciones_auditoria['eliminar'], obj,
+                         antes=self.datos_auditoria(obj))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            registrar_evento(request.user.username, self.acciones_auditoria['eliminar'], obj,
+                             antes=self.datos_auditoria(obj))
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(Sede)
+class SedeAdmin(SoloSuperusuarioMixin, admin.ModelAdmin):
+    list_display = ['nombre', 'slug']
+    prepopulated_fields = {'slug': ['nombre']}
+    search_fields = ['nombre']
+
+
+@admin.register(PerfilStaff)
+class PerfilStaffAdmin(SoloSuperusuarioMixin, admin.ModelAdmin):
+    list_display = ['usuario', 'sede']
+    list_filter = ['sede']
+    list_select_related = ['usuario', 'sede']
+
 
 @admin.register(Sala)
-class SalaAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'capacidad_maxima', 'estado', 'habilitada', 'disponible_para_reserva']
-    list_filter = ['estado', 'habilitada']
+class SalaAdmin(FiltroSedeMixin, AuditoriaAdminMixin, admin.ModelAdmin):
+    list_display = ['nombre', 'sede', 'capacidad_maxima', 'estado', 'habilitada', 'disponible']
+    list_filter = [('sede', FiltroRelacionSede), 'estado', 'habilitada']
+    list_select_related = ['sede']
     list_editable = ['estado', 'habilitada']
     search_fields = ['nombre']
     list_per_page = 20
-    
+
     actions = ['habilitar_salas', 'deshabilitar_salas']
+    acciones_auditoria = {'crear': 'crear_sala', 'editar': 'editar_sala', 'eliminar': 'eliminar_sala'}
+    datos_auditoria = staticmethod(datos_sala)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_disponibilidad()
+
+    @admin.display(boolean=True, description='Disponible para reserva')
+    def disponible(self, obj):
+        return obj.disponible_para_reserva
+
+    def _cambiar_habilitada(self, request, queryset, habilitada):
+        # update() no pasa por save_model: se audita cada sala que cambia
+        salas = list(queryset.exclude(habilitada=habilitada))
+        queryset.filter(id__in=[sala.id for sala in salas]).update(habilitada=habilitada)
+        for sala in salas:
+            antes = datos_sala(sala)
+            sala.habilitada = habilitada
+            registrar_evento(request.user.username, 'editar_sala', sala, antes=antes, despues=datos_sala(sala))
+            registrar_cambio(sala.id, sala.sede_id)
+        return len(salas)
 
     def habilitar_salas(self, request, queryset):
-        updated = queryset.update(habilitada=True)
+        updated = self._cambiar_habilitada(request, queryset, True)
         self.message_user(request, f'{updated} salas habilitadas correctamente.')
     habilitar_salas.short_description = "Habilitar salas seleccionadas"
 
     def deshabilitar_salas(self, request, queryset):
-        updated = queryset.update(habilitada=False)
+        updated = self._cambiar_habilitada(request, queryset, False)
         self.message_user(request, f'{updated} salas deshabilitadas correctamente.')
     deshabilitar_salas.short_description = "Deshabilitar salas seleccionadas"
 
 @admin.register(Reserva)
-class ReservaAdmin(admin.ModelAdmin):
+class ReservaAdmin(FiltroSedeMixin, AuditoriaAdminMixin, admin.ModelAdmin):
     list_display = ['sala', 'rut_reservante', 'fecha_hora_inicio', 'fecha_hora_termino', 'duracion_horas']
-    list_editable = ['fecha_hora_inicio', 'fecha_hora_termino'] 
-    list_filter = ['sala', 'fecha_hora_inicio']
+    list_editable = ['fecha_hora_inicio', 'fecha_hora_termino']
+    list_filter = [('sede', FiltroRelacionSede), ('sala', FiltroRelacionSede), 'fecha_hora_inicio']
+    list_select_related = ['sala']
     search_fields = ['rut_reservante', 'sala__nombre']
     readonly_fields = ['fecha_hora_inicio']
+    # La jerarquía filtra con rangos (__gte/__lt) sobre reservas_inicio_idx
     date_hierarchy = 'fecha_hora_inicio'
+    ordering = ['-fecha_hora_inicio']
     list_per_page = 20
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    acciones_auditoria = {'crear': 'crear_reserva', 'editar': 'editar_reserva', 'eliminar': 'eliminar_reserva'}
+    datos_auditoria = staticmethod(datos_reserva)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            duracion=models.ExpressionWrapper(
+                models.F('fecha_hora_termino') - models.F('fecha_hora_inicio'),
+                output_field=models.DurationField(),
+            )
+        )
 
+    @admin.display(description='Duración', ordering='duracion')
     def duracion_horas(self, obj):
-        diferencia = obj.fecha_hora_termino - obj.fecha_hora_inicio
-        horas = diferencia.total_seconds() / 3600
+        horas = obj.duracion.total_seconds() / 3600
         return f"{horas:.1f} horas"
-    duracion_horas.short_description = 'Duración'
\ No newline at end of file
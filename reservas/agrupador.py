@@ -0,0 +1,239 @@
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturoTimeoutError
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .auditoria import datos_reserva, registrar_evento
+from .versiones import registrar_cambio
+
+logger = logging.getLogger(__name__)
+
+_DETENER = object()
+
+
+class SolicitudReserva:
+    """
+    Reserva validada a la espera del hilo que confirma los lotes
+    """
+
+    def __init__(self, llegada, reserva):
+        self.llegada = llegada
+        self.reserva = reserva
+        self.futuro = Future()
+
+
+class ConfirmadorReservas:
+    """
+    Confirma las reservas en lotes desde un único hilo (group commit).
+
+    Las vistas encolan la reserva ya validada y esperan su resultado. El hilo
+    toma lo acumulado, resuelve los conflictos por orden de llegada, inserta
+    las ganadoras con un solo bulk_create y hace un único COMMIT por lote.
+
+    La cola es por proceso: solo agrupa con workers de varios hilos (gunicorn
+    --threads, gthread) o ASGI. Con workers síncronos de un hilo cada lote
+    tendría una sola reserva.
+    """
+
+    def __init__(self, max_cola, tamano_lote, ventana_ms):
+        self.cola = queue.Queue(maxsize=max_cola)
+        self.tamano_lote = tamano_lote
+        self.ventana = ventana_ms / 1000
+        self.confirmadas = 0
+        self.rechazadas = 0
+        self.lotes = 0
+        self._contador = itertools.count()
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def _iniciar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, name='reservas', daemon=True)
+                self._hilo.start()
+
+    def enviar(self, reserva):
+        """
+        Encola la reserva y devuelve su SolicitudReserva, o None si la cola está llena
+        """
+        self._iniciar()
+        solicitud = SolicitudReserva(next(self._contador), reserva)
+        try:
+            self.cola.put_nowait(solicitud)
+        except queue.Full:
+            return None
+        return solicitud
+
+    def _ejecutar(self):
+        detener = False
+        while not detener:
+            primera = self.cola.get()
+            if primera is _DETENER:
+                break
+            lote = [primera]
+            # Lo que llegó mientras se confirmaba el lote anterior, más una ventana breve
+            limite = time.monotonic() + self.ventana
+            while len(lote) < self.tamano_lote:
+                try:
+                    solicitud = self.cola.get(timeout=max(limite - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if solicitud is _DETENER:
+                    detener = True
+                    break
+                lote.append(solicitud)
+            self._confirmar(lote)
+
+    def _confirmar(self, lote):
+        from .models import Reserva, Sala
+
+        # Las solicitudes cuya vista dejó de esperar (timeout) se descartan
+        lote = sorted(
+            (s for s in lote if s.futuro.set_running_or_notify_cancel()),
+            key=lambda s: s.llegada,
+        )
+        if not lote:
+            return
+        close_old_connections()
+        try:
+            with transaction.atomic():
+                sala_ids = sorted({s.reserva.sala_id for s in lote})
+                # Bloquea las salas del lote frente a las demás escrituras de reservas
+                salas = {sala.id: sala for sala in Sala.objects.bloquear().filter(id__in=sala_ids)}
+                ocupadas = terminos_vigentes(sala_ids, min(s.reserva.fecha_hora_inicio for s in lote))
+
+                ganadoras = []
+                for solicitud in lote:
+                    reserva = solicitud.reserva
+                    sala = salas.get(reserva.sala_id)
+                    inicio = reserva.fecha_hora_inicio
+                    # Mismo criterio que Sala.disponible_para_reserva, contando las ya aceptadas del lote
+                    libre = (
+                        sala is not None and sala.habilitada and sala.estado == 'disponible'
+                        and not any(termino >= inicio for termino in ocupadas.get(sala.id, []))
+                    )
+                    if libre:
+                        reserva.sala = sala
+                        reserva.sede_id = sala.sede_id
+                        ocupadas.setdefault(sala.id, []).append(reserva.fecha_hora_termino)
+                        ganadoras.append(solicitud)
+
+                Reserva.objects.bulk_create([s.reserva for s in ganadoras])
+        except Exception as error:
+            logger.exception('No se pudo confirmar un lote de %s reservas', len(lote))
+            for solicitud in lote:
+                solicitud.futuro.set_exception(error)
+            return
+
+        # bulk_create no emite señales: invalidar y auditar a mano
+        for sala_id, sede_id in {(s.reserva.sala_id, s.reserva.sede_id) for s in ganadoras}:
+            registrar_cambio(sala_id, sede_id)
+        for solicitud in ganadoras:
+            reserva = solicitud.reserva
+            registrar_evento(f'RUT {reserva.rut_reservante}', 'crear_reserva', reserva,
+                             despues=datos_reserva(reserva))
+
+        aceptadas = {id(s) for s in ganadoras}
+        for solicitud in lote:
+            solicitud.futuro.set_result(id(solicitud) in aceptadas)
+        with self._lock:
+            self.confirmadas += len(ganadoras)
+            self.rechazadas += len(lote) - len(ganadoras)
+            self.lotes += 1
+
+    def detener(self, timeout=5):
+        """
+        Confirma lo pendiente y detiene el hilo (se llama al cerrar el proceso)
+        """
+        if self._hilo is None or not self._hilo.is_alive():
+            return
+        try:
+            self.cola.put(_DETENER, timeout=timeout)
+        except queue.Full:
+            return
+        self._hilo.join(timeout)
+
+    def metricas(self):
+        return {
+            'en_cola': self.cola.qsize(),
+            'capacidad': self.cola.maxsize,
+            'confirmadas': self.confirmadas,
+            'rechazadas': self.rechazadas,
+            'lotes': self.lotes,
+        }
+
+
+confirmador = ConfirmadorReservas(
+    max_cola=settings.RESERVAS_MAX_COLA,
+    tamano_lote=settings.RESERVAS_LOTE,
+    ventana_ms=settings.RESERVAS_VENTANA_MS,
+)
+atexit.register(confirmador.detener)
+
+
+def terminos_vigentes(sala_ids, desde):
+    """
+    {sala_id: [termino]} de las reservas ya comenzadas que siguen vigentes en `desde`
+    """
+    from .models import Reserva
+
+    ocupadas = {}
+    for sala_id, termino in Reserva.objects.filter(
+        sala_id__in=sala_ids,
+        fecha_hora_inicio__lte=timezone.now(),
+        fecha_hora_termino__gte=desde,
+    ).values_list('sala_id', 'fecha_hora_termino'):
+        ocupadas.setdefault(sala_id, []).append(termino)
+    return ocupadas
+
+
+def guardar_reserva(reserva):
+    """
+    Guarda una reserva sin pasar por la cola (modo normal o cola llena): toma el
+    mismo bloqueo de sala que los lotes y vuelve a verificar la disponibilidad.
+    Devuelve False si la sala ya no estaba disponible.
+    """
+    from .models import Sala
+
+    with transaction.atomic():
+        sala = Sala.objects.bloquear().get(id=reserva.sala_id)
+        if (not sala.habilitada or sala.estado != 'disponible'
+                or terminos_vigentes([sala.id], reserva.fecha_hora_inicio)):
+            return False
+        reserva.sala = sala
+        reserva.save()
+    registrar_evento(f'RUT {reserva.rut_reservante}', 'crear_reserva', reserva,
+                     despues=datos_reserva(reserva))
+    return True
+
+
+def confirmar_reserva(reserva):
+    """
+    Confirma la reserva en el próximo lote y devuelve True si quedó registrada
+    o False si la sala ya no estaba disponible. Si la cola está llena se guarda
+    directamente, como en el modo normal.
+    """
+    if reserva.fecha_hora_termino - reserva.fecha_hora_inicio > timedelta(minutes=120):
+        raise ValueError("La reserva no puede exceder las 2 horas")
+
+    solicitud = confirmador.enviar(reserva)
+    if solicitud is None:
+        return guardar_reserva(reserva)
+    try:
+        return solicitud.futuro.result(timeout=settings.RESERVAS_ESPERA_SEGUNDOS)
+    except FuturoTimeoutError:
+        # Cancelada antes de entrar a un lote: el confirmador ya no la insertará
+        if solicitud.futuro.cancel():
+            raise
+        # Ya está en el lote en curso: su resultado llega en cuanto termine
+        return solicitud.futuro.result()
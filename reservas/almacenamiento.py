@@ -0,0 +1,68 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # está en requirements.txt; sin él solo se generan las variantes .gz
+    brotli = None
+
+# Archivos estáticos con nombre por contenido (style.3f2a9c1b.css) y variantes
+# precomprimidas generadas en collectstatic. Con un servidor web delante, p. ej. nginx:
+#
+#     location /static/ {
+#         alias /srv/biblioteca/staticfiles/;
+#         gzip_static on;
+#         brotli_static on;
+#         add_header Cache-Control "public, max-age=31536000, immutable";
+#     }
+#
+# Sin servidor web, los sirve EstaticosMiddleware (SERVIR_ESTATICOS=True).
+
+EXTENSIONES_COMPRIMIBLES = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico'}
+TAMANO_MINIMO = 256
+
+
+def comprimir_gzip(contenido):
+    # mtime=0 para que el .gz sea reproducible entre despliegues
+    return gzip.compress(contenido, compresslevel=9, mtime=0)
+
+
+def comprimir_brotli(contenido):
+    return brotli.compress(contenido, quality=11)
+
+
+class AlmacenamientoComprimido(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage que además escribe junto a cada archivo
+    comprimible sus variantes .gz y .br (si brotli está instalado)
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        compresores = [('.gz', comprimir_gzip)]
+        if brotli is not None:
+            compresores.append(('.br', comprimir_brotli))
+
+        for original, procesado in self.hashed_files.items():
+            # Se comprimen el nombre con hash y el original (lo usa DEBUG y {% static %} sin manifiesto)
+            for nombre in {original, procesado}:
+                if os.path.splitext(nombre)[1].lower() not in EXTENSIONES_COMPRIMIBLES:
+                    continue
+                with self.open(nombre) as archivo:
+                    contenido = archivo.read()
+                if len(contenido) < TAMANO_MINIMO:
+                    continue
+                for extension, comprimir in compresores:
+                    comprimido = comprimir(contenido)
+                    # Solo vale la pena si ahorra bytes
+                    if len(comprimido) >= len(contenido):
+                        continue
+                    if self.exists(nombre + extension):
+                        self.delete(nombre + extension)
+                    self._save(nombre + extension, ContentFile(comprimido))
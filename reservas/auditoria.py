@@ -0,0 +1,177 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_DETENER = object()
+
+
+def datos_reserva(reserva):
+    """
+    Valores de una reserva que se guardan como antes/después en la auditoría
+    """
+    return {
+        'sala': reserva.sala.nombre,
+        'rut_reservante': reserva.rut_reservante,
+        'fecha_hora_inicio': reserva.fecha_hora_inicio.isoformat(),
+        'fecha_hora_termino': reserva.fecha_hora_termino.isoformat(),
+        'duracion_minutos': reserva.duracion_minutos,
+    }
+
+
+def datos_sala(sala):
+    return {
+        'nombre': sala.nombre,
+        'capacidad_maxima': sala.capacidad_maxima,
+        'estado': sala.estado,
+        'habilitada': sala.habilitada,
+    }
+
+
+def datos_serie(serie):
+    return {
+        'sala': serie.sala.nombre,
+        'rut_reservante': serie.rut_reservante,
+        'frecuencia': serie.frecuencia,
+        'hora_inicio': serie.hora_inicio.strftime('%H:%M'),
+        'duracion_minutos': serie.duracion_minutos,
+        'fecha_inicio': serie.fecha_inicio.isoformat(),
+        'fecha_fin': serie.fecha_fin.isoformat(),
+        'excepciones': list(serie.excepciones or []),
+    }
+
+
+class EscritorAuditoria:
+    """
+    Escribe los eventos de auditoría en lotes desde un hilo en segundo plano.
+
+    Las vistas solo encolan el evento; si la cola está llena el evento se
+    descarta y se cuenta, para que la auditoría nunca bloquee una reserva.
+    """
+
+    def __init__(self, max_cola, tamano_lote, intervalo_ms):
+        self.cola = queue.Queue(maxsize=max_cola)
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo_ms / 1000
+        self.descartados = 0
+        self.escritos = 0
+        self.lotes = 0
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def _iniciar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, name='auditoria', daemon=True)
+                self._hilo.start()
+
+    def registrar(self, evento):
+        self._iniciar()
+        try:
+            self.cola.put_nowait(evento)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+
+    def _ejecutar(self):
+        detener = False
+        while not detener:
+            lote = []
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    evento = self.cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if evento is _DETENER:
+                    detener = True
+                    break
+                lote.append(evento)
+            if lote:
+                self._escribir(lote)
+
+    def _escribir(self, lote):
+        from .models import RegistroAuditoria
+
+        close_old_connections()
+        try:
+            RegistroAuditoria.objects.bulk_create(lote)
+        except DatabaseError:
+            # Un evento inválido no debe descartar el lote completo: reintentar uno a uno
+            logger.warning('Falló el lote de %s eventos de auditoría; se reintenta uno a uno', len(lote))
+            escritos = descartados = 0
+            for evento in lote:
+                try:
+                    evento.save(force_insert=True)
+                except DatabaseError:
+                    logger.exception('No se pudo escribir el evento de auditoría %s', evento.accion)
+                    descartados += 1
+                else:
+                    escritos += 1
+            with self._lock:
+                self.escritos += escritos
+                self.descartados += descartados
+                self.lotes += 1
+        else:
+            with self._lock:
+                self.escritos += len(lote)
+                self.lotes += 1
+
+    def detener(self, timeout=5):
+        """
+        Vacía la cola pendiente y detiene el hilo (se llama al cerrar el proceso)
+        """
+        if self._hilo is None or not self._hilo.is_alive():
+            return
+        try:
+            self.cola.put(_DETENER, timeout=timeout)
+        except queue.Full:
+            return
+        self._hilo.join(timeout)
+
+    def metricas(self):
+        return {
+            'en_cola': self.cola.qsize(),
+            'capacidad': self.cola.maxsize,
+            'descartados': self.descartados,
+            'escritos': self.escritos,
+            'lotes': self.lotes,
+        }
+
+
+escritor = EscritorAuditoria(
+    max_cola=settings.AUDITORIA_MAX_COLA,
+    tamano_lote=settings.AUDITORIA_LOTE,
+    intervalo_ms=settings.AUDITORIA_INTERVALO_MS,
+)
+atexit.register(escritor.detener)
+
+
+def registrar_evento(actor, accion, objeto, antes=None, despues=None):
+    """
+    Encola un evento de auditoría sin escribir en la base de datos
+    """
+    from .models import RegistroAuditoria
+
+    escritor.registrar(RegistroAuditoria(
+        fecha=timezone.now(),
+        sede_id=objeto.sede_id,
+        actor=str(actor)[:150],
+        accion=accion,
+        modelo=objeto._meta.model_name,
+        objeto_id=objeto.pk,
+        antes=antes,
+        despues=despues,
+    ))
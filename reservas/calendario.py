@@ -0,0 +1,88 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Reserva
+
+
+def _fecha_ical(valor):
+    return valor.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _texto_ical(valor):
+    return (
+        valor.replace('\\', '\\\\').replace(';', '\\;')
+        .replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def _linea(contenido):
+    """
+    Pliega la línea a 75 octetos como exige RFC 5545
+    """
+    datos = contenido.encode('utf-8')
+    partes = []
+    while len(datos) > 75:
+        corte = 75 if not partes else 74
+        # No cortar en medio de un carácter multibyte
+        while corte > 0 and (datos[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(datos[:corte].decode('utf-8'))
+        datos = datos[corte:]
+    partes.append(datos.decode('utf-8'))
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def ventana_calendario(hoy=None):
+    """
+    (desde, hasta) de la ventana publicada. Se mueve por días completos, a la
+    medianoche local, para que el ETag del feed pueda incluir la fecha.
+    """
+    hoy = hoy or timezone.localdate()
+    desde = timezone.make_aware(datetime.combine(hoy - timedelta(days=settings.CALENDARIO_DIAS_ATRAS), time.min))
+    hasta = timezone.make_aware(datetime.combine(hoy + timedelta(days=settings.CALENDARIO_DIAS_ADELANTE + 1), time.min))
+    return desde, hasta
+
+
+def reservas_en_ventana(sala=None, sede=None):
+    """
+    Reservas dentro de la ventana móvil publicada en los calendarios
+    """
+    desde, hasta = ventana_calendario()
+    reservas = Reserva.objects.filter(
+        fecha_hora_termino__gte=desde,
+        fecha_hora_inicio__lt=hasta,
+    )
+    if sala is not None:
+        reservas = reservas.filter(sala=sala)
+    if sede is not None:
+        reservas = reservas.filter(sede=sede)
+    return reservas.order_by('fecha_hora_inicio').values_list(
+        'id', 'fecha_hora_inicio', 'fecha_hora_termino', 'sala__nombre'
+    )
+
+
+def generar_ical(nombre_calendario, reservas):
+    """
+    Genera el calendario línea por línea para enviarlo como respuesta en streaming
+    """
+    dtstamp = _fecha_ical(timezone.now())
+    yield _linea('BEGIN:VCALENDAR')
+    yield _linea('VERSION:2.0')
+    yield _linea('PRODID:-//Biblioteca ITID//Reservas de Salas//ES')
+    yield _linea('CALSCALE:GREGORIAN')
+    yield _linea(f'X-WR-CALNAME:{_texto_ical(nombre_calendario)}')
+
+    for reserva_id, inicio, termino, sala_nombre in reservas.iterator(chunk_size=500):
+        # El RUT del reservante no se publica en el calendario
+        yield _linea('BEGIN:VEVENT')
+        yield _linea(f'UID:reserva-{reserva_id}@biblioteca')
+        yield _linea(f'DTSTAMP:{dtstamp}')
+        yield _linea(f'DTSTART:{_fecha_ical(inicio)}')
+        yield _linea(f'DTEND:{_fecha_ical(termino)}')
+        yield _linea(f'SUMMARY:{_texto_ical("Reservada: " + sala_nombre)}')
+        yield _linea(f'LOCATION:{_texto_ical(sala_nombre)}')
+        yield _linea('END:VEVENT')
+
+    yield _linea('END:VCALENDAR')
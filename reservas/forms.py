@@ -1,5 +1,6 @@
+from datetime import date
 from django import forms
-from .models import Reserva
+from .models import Reserva, SerieReserva
 
 class ReservaForm(forms.ModelForm):
     DURACION_OPCIONES = [
@@ -55,4 +56,74 @@ class ReservaForm(forms.ModelForm):
                 raise forms.ValidationError('La duración debe estar entre 1 minuto y 2 horas')
             return duracion
         except (ValueError, TypeError):
-            raise forms.ValidationError('Duración inválida')
\ No newline at end of file
+            raise forms.ValidationError('Duración inválida')
+
+class SerieReservaForm(forms.ModelForm):
+    duracion_minutos = forms.TypedChoiceField(
+        choices=ReservaForm.DURACION_OPCIONES,
+        coerce=int,
+        initial=120,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Duración de cada sesión'
+    )
+    excepciones = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'AAAA-MM-DD, AAAA-MM-DD'
+        }),
+        label='Fechas excluidas',
+        help_text='Fechas sin sesión (feriados, recesos), separadas por coma.'
+    )
+    
+    class Meta:
+        model = SerieReserva
+        fields = ['sala', 'rut_reservante', 'frecuencia', 'hora_inicio', 'duracion_minutos', 'fecha_inicio', 'fecha_fin', 'excepciones']
+        widgets = {
+            'sala': forms.Select(attrs={'class': 'form-select'}),
+            'rut_reservante': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '12.345.678-9'}),
+            'frecuencia': forms.Select(attrs={'class': 'form-select'}),
+            'hora_inicio': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
+            'fecha_inicio': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'fecha_fin': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+        }
+        labels = {
+            'rut_reservante': 'RUT del responsable',
+            'hora_inicio': 'Hora de inicio',
+            'fecha_inicio': 'Desde',
+            'fecha_fin': 'Hasta',
+        }
+    
+    def __init__(self, *args, salas=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if salas is not None:
+            self.fields['sala'].queryset = salas
+        if self.instance.pk:
+            self.initial['excepciones'] = ', '.join(self.instance.excepciones or [])
+    
+    def clean_rut_reservante(self):
+        return ReservaForm.clean_rut_reservante(self)
+    
+    def clean_excepciones(self):
+        texto = self.cleaned_data.get('excepciones') or ''
+        fechas = []
+        for parte in texto.split(','):
+            parte = parte.strip()
+            if not parte:
+                continue
+            try:
+                fechas.append(date.fromisoformat(parte).isoformat())
+            except ValueError:
+                raise forms.ValidationError(f'Fecha inválida: {parte}')
+        return fechas
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        inicio = cleaned_data.get('fecha_inicio')
+        fin = cleaned_data.get('fecha_fin')
+        if inicio and fin:
+            if fin < inicio:
+                raise forms.ValidationError('La fecha de término debe ser posterior a la de inicio')
+            if (fin - inicio).days > 366:
+                raise forms.ValidationError('Una serie no puede durar más de un año')
+        return cleaned_data
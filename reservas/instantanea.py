@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import OuterRef, Subquery
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Reserva, Sala, Sede
+
+# Instantánea estática del estado de las salas para las pantallas de la entrada.
+# Se escribe en INSTANTANEA_DIR/<sede>/ (salas.json e index.html) y la sirve
+# directamente el servidor web, p. ej. en nginx:
+#
+#     location /kiosco/ { alias /srv/biblioteca/instantanea/; }
+#
+# Se vuelve a publicar cuando cambia una reserva o sala (versiones.registrar_cambio).
+# Los cambios de estado por el paso del tiempo (una reserva que vence o comienza)
+# los publica el comando, que debe quedar corriendo o en cron:
+#
+#     python manage.py publicar_instantanea --cada 30
+#     * * * * * python manage.py publicar_instantanea --vencidas
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pendientes = {}
+
+
+def construir_estado(sede):
+    """
+    Estado de todas las salas habilitadas de la sede, calculado en una consulta
+    """
+    ahora = timezone.now()
+    activa = Reserva.objects.filter(
+        sala=OuterRef('pk'),
+        fecha_hora_inicio__lte=ahora,
+        fecha_hora_termino__gte=ahora,
+    ).order_by('-fecha_hora_termino')
+    proxima = Reserva.objects.filter(
+        sala=OuterRef('pk'),
+        fecha_hora_inicio__gt=ahora,
+    ).order_by('fecha_hora_inicio')
+
+    salas = Sala.objects.filter(sede=sede, habilitada=True).annotate(
+        ocupada_hasta=Subquery(activa.values('fecha_hora_termino')[:1]),
+        proxima_reserva=Subquery(proxima.values('fecha_hora_inicio')[:1]),
+    ).order_by('nombre')
+
+    estado_salas = []
+    transiciones = []
+    for sala in salas:
+        if sala.estado == 'mantenimiento':
+            estado = 'mantenimiento'
+        elif sala.ocupada_hasta:
+            estado = 'ocupada'
+        else:
+            estado = 'disponible'
+        for instante in (sala.ocupada_hasta, sala.proxima_reserva):
+            if instante:
+                transiciones.append(instante)
+        estado_salas.append({
+            'id': sala.id,
+            'nombre': sala.nombre,
+            'capacidad_maxima': sala.capacidad_maxima,
+            'estado': estado,
+            'ocupada_hasta': sala.ocupada_hasta.isoformat() if sala.ocupada_hasta else None,
+            'proxima_reserva': sala.proxima_reserva.isoformat() if sala.proxima_reserva else None,
+        })
+
+    return {
+        'version': int(time.time() * 1000),
+        'generado': ahora.isoformat(),
+        'sede': {'id': sede.id, 'nombre': sede.nombre, 'slug': sede.slug},
+        'salas': estado_salas,
+        'proxima_transicion': min(transiciones).isoformat() if transiciones else None,
+    }
+
+
+def _escribir_atomico(ruta, contenido):
+    """
+    Escribe en un archivo temporal del mismo directorio y lo renombra: los
+    lectores ven el archivo anterior o el nuevo, nunca uno a medio escribir
+    """
+    directorio = os.path.dirname(ruta)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+def publicar_instantanea(sede):
+    """
+    Escribe de forma atómica salas.json e index.html de la sede y devuelve el
+    estado publicado. Las republicaciones por vencimiento las hace el comando
+    publicar_instantanea (--vencidas o --cada)
+    """
+    estado = construir_estado(sede)
+    directorio = os.path.join(settings.INSTANTANEA_DIR, sede.slug)
+    os.makedirs(directorio, exist_ok=True)
+
+    _escribir_atomico(
+        os.path.join(directorio, 'salas.json'),
+        json.dumps(estado, ensure_ascii=False),
+    )
+    _escribir_atomico(
+        os.path.join(directorio, 'index.html'),
+        render_to_string('kiosco.html', {'estado': estado, 'ahora': timezone.now()}),
+    )
+
+    return estado
+
+
+def instantanea_vencida(sede):
+    """
+    True si la instantánea publicada no existe, ya pasó su próxima transición
+    o tiene más de INSTANTANEA_ESPERA_MAXIMA segundos
+    """
+    ruta = os.path.join(settings.INSTANTANEA_DIR, sede.slug, 'salas.json')
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            estado = json.load(archivo)
+    except (OSError, ValueError):
+        return True
+
+    ahora = timezone.now()
+    generado = datetime.fromisoformat(estado['generado'])
+    if ahora - generado > timedelta(seconds=settings.INSTANTANEA_ESPERA_MAXIMA):
+        return True
+    proxima = estado.get('proxima_transicion')
+    return proxima is not None and datetime.fromisoformat(proxima) <= ahora
+
+
+def _publicar_programada(sede_id, temporizador):
+    with _lock:
+        if _pendientes.get(sede_id) is temporizador:
+            del _pendientes[sede_id]
+    close_old_connections()
+    try:
+        sede = Sede.objects.filter(id=sede_id).first()
+        if sede:
+            publicar_instantanea(sede)
+    except Exception:
+        logger.exception('No se pudo publicar la instantánea de la sede %s', sede_id)
+    finally:
+        close_old_connections()
+
+
+def programar_publicacion(sede_id):
+    """
+    Publica la instantánea de la sede en segundo plano tras INSTANTANEA_AGRUPAR_SEGUNDOS.
+    Varios cambios seguidos se agrupan en una sola publicación.
+    """
+    if not settings.INSTANTANEA_ACTIVA:
+        return
+
+    with _lock:
+        if sede_id in _pendientes:
+            return
+        temporizador = threading.Timer(
+            settings.INSTANTANEA_AGRUPAR_SEGUNDOS, lambda: _publicar_programada(sede_id, temporizador)
+        )
+        temporizador.daemon = True
+        _pendientes[sede_id] = temporizador
+        temporizador.start()
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservas.pronostico import calcular_pronostico
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la probabilidad de ocupación por sala, día de la semana y bloque de 15 minutos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=365, help='Días de historial a considerar')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = calcular_pronostico(dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronóstico de {len(resultado)} salas calculado en {time.perf_counter() - inicio:.2f}s'
+        ))
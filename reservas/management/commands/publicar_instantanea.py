@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from reservas.instantanea import instantanea_vencida, publicar_instantanea
+from reservas.models import Sede
+
+
+class Command(BaseCommand):
+    help = 'Regenera la instantánea estática de salas para los kioscos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sede', help='Slug de la sede (por defecto, todas)')
+        parser.add_argument(
+            '--vencidas', action='store_true',
+            help='Publicar solo las sedes cuya instantánea ya pasó su próxima transición (modo cron)'
+        )
+        parser.add_argument(
+            '--cada', type=int, metavar='SEGUNDOS',
+            help='Quedar corriendo y revisar las instantáneas vencidas cada SEGUNDOS'
+        )
+
+    def handle(self, *args, **options):
+        if options['sede'] and not Sede.objects.filter(slug=options['sede']).exists():
+            raise CommandError(f"No existe la sede '{options['sede']}'")
+
+        if not options['cada']:
+            self._publicar(options['sede'], options['vencidas'])
+            return
+
+        # La primera vuelta publica todo: tras un despliegue no se confía en lo que haya en disco
+        vencidas = options['vencidas']
+        while True:
+            self._publicar(options['sede'], vencidas)
+            vencidas = True
+            close_old_connections()
+            time.sleep(options['cada'])
+
+    def _publicar(self, slug, vencidas):
+        sedes = Sede.objects.order_by('nombre')
+        if slug:
+            sedes = sedes.filter(slug=slug)
+
+        for sede in sedes:
+            if vencidas and not instantanea_vencida(sede):
+                continue
+            estado = publicar_instantanea(sede)
+            self.stdout.write(self.style.SUCCESS(
+                f"{sede.nombre}: {len(estado['salas'])} salas, versión {estado['version']}"
+            ))
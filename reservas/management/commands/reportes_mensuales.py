@@ -0,0 +1,115 @@
+import csv
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from reservas.models import Sala
+from reservas.reportes import calcular_tramo, combinar_tramos, inicializar_worker
+
+
+class Command(BaseCommand):
+    help = 'Genera los reportes mensuales de uso por sala en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mes a reportar en formato AAAA-MM (por defecto, el mes anterior)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Cantidad de procesos')
+        parser.add_argument('--salida', default='reportes', help='Directorio donde escribir los reportes')
+        parser.add_argument('--sede', help='Slug de la sede a reportar (por defecto, todas)')
+        parser.add_argument(
+            '--dividir', choices=['sala', 'semana'], default='sala',
+            help='Unidad de trabajo: una sala completa o una semana de una sala'
+        )
+
+    def handle(self, *args, **options):
+        inicio, fin = self._rango_mes(options['mes'])
+        directorio = os.path.join(options['salida'], inicio.strftime('%Y-%m'))
+        os.makedirs(directorio, exist_ok=True)
+
+        salas = Sala.objects.select_related('sede').order_by('sede__nombre', 'nombre')
+        if options['sede']:
+            salas = salas.filter(sede__slug=options['sede'])
+        salas = {sala.id: sala for sala in salas}
+        tareas = []
+        for sala_id in salas:
+            if options['dividir'] == 'semana':
+                desde = inicio
+                while desde < fin:
+                    hasta = min(desde + timedelta(days=7), fin)
+                    tareas.append((sala_id, desde, hasta))
+                    desde = hasta
+            else:
+                tareas.append((sala_id, inicio, fin))
+
+        # Los procesos hijos no deben heredar la conexión abierta del padre
+        connections.close_all()
+
+        reloj = time.perf_counter()
+        tramos = defaultdict(list)
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=inicializar_worker) as pool:
+            futuros = [pool.submit(calcular_tramo, *tarea) for tarea in tareas]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                tramos[resultado['sala_id']].append(resultado)
+
+        resumen = []
+        for sala_id, sala in salas.items():
+            datos = combinar_tramos(tramos[sala_id])
+            datos['sala'] = sala
+            self._escribir_sala(directorio, sala, datos, inicio)
+            resumen.append(datos)
+
+        self._escribir_resumen(directorio, resumen, inicio)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(salas)} reportes ({len(tareas)} tareas, {options["workers"]} workers) '
+            f'generados en {directorio} en {time.perf_counter() - reloj:.1f}s'
+        ))
+
+    def _rango_mes(self, mes):
+        if mes:
+            try:
+                primero = datetime.strptime(mes, '%Y-%m')
+            except ValueError:
+                raise CommandError('El mes debe tener formato AAAA-MM')
+        else:
+            hoy = timezone.localdate()
+            anterior = hoy.replace(day=1) - timedelta(days=1)
+            primero = datetime(anterior.year, anterior.month, 1)
+
+        siguiente = (primero + timedelta(days=32)).replace(day=1)
+        return timezone.make_aware(primero), timezone.make_aware(siguiente)
+
+    def _escribir_sala(self, directorio, sala, datos, inicio):
+        base = os.path.join(directorio, f'sala_{sala.id}')
+        with open(base + '.csv', 'w', newline='', encoding='utf-8') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(['fecha', 'reservas', 'horas'])
+            for dia in datos['dias']:
+                escritor.writerow([dia['fecha'], dia['reservas'], dia['horas']])
+
+        with open(base + '.html', 'w', encoding='utf-8') as archivo:
+            archivo.write(render_to_string('reportes/sala.html', {'datos': datos, 'sala': sala, 'mes': inicio}))
+
+    def _escribir_resumen(self, directorio, resumen, inicio):
+        with open(os.path.join(directorio, 'resumen.csv'), 'w', newline='', encoding='utf-8') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow([
+                'sede', 'sala', 'reservas', 'horas_reservadas', 'duracion_promedio_min',
+                'horas_punta', 'finalizaciones_anticipadas',
+            ])
+            for datos in resumen:
+                escritor.writerow([
+                    datos['sala'].sede.nombre, datos['sala'].nombre, datos['cantidad'], datos['horas_reservadas'],
+                    datos['duracion_promedio'], ' '.join(f'{h:02d}:00' for h in datos['horas_punta']),
+                    datos['finalizaciones_anticipadas'],
+                ])
+
+        with open(os.path.join(directorio, 'resumen.html'), 'w', encoding='utf-8') as archivo:
+            archivo.write(render_to_string('reportes/resumen.html', {'resumen': resumen, 'mes': inicio}))
@@ -0,0 +1,282 @@
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from http.cookiejar import CookieJar
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from reservas.models import Sala, Reserva
+
+
+# Escenario por defecto: la "hora punta" de inicio de semestre.
+# Se puede reemplazar con un archivo JSON con la misma estructura (--escenario).
+ESCENARIO_POR_DEFECTO = {
+    'nombre': 'inicio_semestre',
+    'duracion_segundos': 30,
+    'salas_populares': 3,
+    'perfiles': [
+        {
+            'nombre': 'estudiante',
+            'usuarios': 40,
+            'pausa_ms': [100, 600],
+            'pasos': ['index', 'detalle_sala', 'reservar_sala'],
+        },
+        {
+            'nombre': 'personal',
+            'usuarios': 4,
+            'pausa_ms': [500, 1500],
+            'requiere_login': True,
+            'pasos': ['admin_panel', 'gestion_reservas'],
+        },
+    ],
+}
+
+PATRON_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class _SinRedireccion(urllib.request.HTTPRedirectHandler):
+    """Permite distinguir una reserva exitosa (redirige a index) de una rechazada"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Metricas:
+    """
+    Acumula latencias y resultados por endpoint desde varios hilos
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.resultados = defaultdict(int)
+
+    def registrar(self, endpoint, segundos, error=False):
+        with self._lock:
+            self.latencias[endpoint].append(segundos)
+            if error:
+                self.errores[endpoint] += 1
+
+    def contar(self, resultado):
+        with self._lock:
+            self.resultados[resultado] += 1
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, int(round(p / 100 * len(valores_ordenados))) - 1)
+    return valores_ordenados[indice]
+
+
+class UsuarioVirtual(threading.Thread):
+    """
+    Un estudiante o funcionario que recorre los pasos de su perfil hasta el fin de la prueba
+    """
+
+    def __init__(self, base_url, perfil, salas, salas_populares, metricas, fin, semilla, credenciales):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.perfil = perfil
+        self.salas = salas
+        self.salas_populares = salas_populares
+        self.metricas = metricas
+        self.fin = fin
+        self.azar = random.Random(semilla)
+        self.credenciales = credenciales
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()),
+            _SinRedireccion(),
+        )
+
+    def _pedir(self, endpoint, ruta, datos=None):
+        """
+        Ejecuta una petición y devuelve (status, cuerpo, location)
+        """
+        url = self.base_url + ruta
+        cuerpo_envio = urllib.parse.urlencode(datos).encode() if datos is not None else None
+        peticion = urllib.request.Request(url, data=cuerpo_envio)
+        if datos is not None:
+            peticion.add_header('Referer', url)
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(peticion, timeout=30) as respuesta:
+                status, cuerpo, location = respuesta.status, respuesta.read().decode('utf-8', 'replace'), ''
+        except urllib.error.HTTPError as e:
+            status, cuerpo, location = e.code, '', e.headers.get('Location', '')
+        except (urllib.error.URLError, OSError):
+            self.metricas.registrar(endpoint, time.perf_counter() - inicio, error=True)
+            return None, '', ''
+        self.metricas.registrar(endpoint, time.perf_counter() - inicio, error=status >= 400)
+        return status, cuerpo, location
+
+    def _login(self):
+        _, cuerpo, _ = self._pedir('admin_login', '/administracion/login/')
+        token = PATRON_CSRF.search(cuerpo)
+        if not token:
+            return False
+        status, _, location = self._pedir('admin_login', '/administracion/login/', {
+            'csrfmiddlewaretoken': token.group(1),
+            'username': self.credenciales[0],
+            'password': self.credenciales[1],
+        })
+        return status == 302 and 'panel' in location
+
+    def _rut(self):
+        numero = self.azar.randint(10000000, 25999999)
+        return f"{numero}-{self.azar.choice('0123456789K')}"
+
+    def _reservar(self, sala_id):
+        ruta = f'/reservar/{sala_id}/'
+        status, cuerpo, _ = self._pedir('reservar_sala', ruta)
+        if status == 302:
+            self.metricas.contar('sala_no_disponible')
+            return
+        token = PATRON_CSRF.search(cuerpo)
+        if status != 200 or not token:
+            return
+        status, _, location = self._pedir('reservar_sala', ruta, {
+            'csrfmiddlewaretoken': token.group(1),
+            'rut_reservante': self._rut(),
+            'duracion_minutos': self.azar.choice([15, 30, 60, 90, 120]),
+        })
+        if status == 302 and urllib.parse.urlsplit(location).path == '/':
+            self.metricas.contar('reserva_exitosa')
+        elif status == 302:
+            self.metricas.contar('sala_no_disponible')
+        else:
+            self.metricas.contar('reserva_fallida')
+
+    def run(self):
+        if self.perfil.get('requiere_login') and not self._login():
+            self.metricas.contar('login_fallido')
+            return
+
+        pausa_min, pausa_max = self.perfil.get('pausa_ms', [0, 0])
+        while time.monotonic() < self.fin:
+            sala_id = self.azar.choice(self.salas_populares or self.salas)
+            for paso in self.perfil['pasos']:
+                if time.monotonic() >= self.fin:
+                    break
+                if paso == 'index':
+                    self._pedir(paso, '/')
+                elif paso == 'detalle_sala':
+                    self._pedir(paso, f'/sala/{sala_id}/')
+                elif paso == 'reservar_sala':
+                    self._reservar(sala_id)
+                elif paso == 'admin_panel':
+                    self._pedir(paso, '/administracion/panel/')
+                elif paso == 'gestion_reservas':
+                    self._pedir(paso, '/administracion/reservas/?estado=activas')
+                time.sleep(self.azar.uniform(pausa_min, pausa_max) / 1000)
+
+
+class Command(BaseCommand):
+    help = 'Simula la demanda de inicio de semestre contra un servidor local y reporta latencias y dobles reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor (runserver o ASGI)')
+        parser.add_argument('--escenario', help='Archivo JSON con el escenario a reproducir')
+        parser.add_argument('--duracion', type=int, help='Sobrescribe la duración del escenario en segundos')
+        parser.add_argument('--semilla', type=int, default=2024, help='Semilla para reproducir la misma secuencia')
+        parser.add_argument('--usuario', default='', help='Usuario staff para los perfiles que requieren login')
+        parser.add_argument('--clave', default='', help='Contraseña del usuario staff')
+
+    def handle(self, *args, **options):
+        escenario = ESCENARIO_POR_DEFECTO
+        if options['escenario']:
+            try:
+                with open(options['escenario'], encoding='utf-8') as archivo:
+                    escenario = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer el escenario: {e}')
+
+        duracion = options['duracion'] or escenario.get('duracion_segundos', 30)
+
+        salas = list(Sala.objects.filter(habilitada=True).order_by('id').values_list('id', flat=True))
+        if not salas:
+            raise CommandError('No hay salas habilitadas para simular.')
+        salas_populares = list(
+            Sala.objects.filter(habilitada=True, estado='disponible')
+            .order_by('id').values_list('id', flat=True)[:escenario.get('salas_populares', 3)]
+        )
+
+        requiere_login = any(p.get('requiere_login') for p in escenario['perfiles'])
+        if requiere_login and not options['usuario']:
+            raise CommandError('El escenario incluye personal: indica --usuario y --clave.')
+
+        metricas = Metricas()
+        inicio_prueba = timezone.now()
+        fin = time.monotonic() + duracion
+        usuarios = []
+        for perfil in escenario['perfiles']:
+            for i in range(perfil.get('usuarios', 1)):
+                usuarios.append(UsuarioVirtual(
+                    options['url'], perfil, salas, salas_populares, metricas, fin,
+                    semilla=f"{options['semilla']}-{perfil['nombre']}-{i}",
+                    credenciales=(options['usuario'], options['clave']),
+                ))
+
+        self.stdout.write(
+            f"Escenario '{escenario.get('nombre', 'sin nombre')}': {len(usuarios)} usuarios durante {duracion}s contra {options['url']}"
+        )
+        inicio = time.perf_counter()
+        for usuario in usuarios:
+            usuario.start()
+        for usuario in usuarios:
+            usuario.join()
+        transcurrido = time.perf_counter() - inicio
+
+        self._reportar(metricas, transcurrido)
+        self._verificar_dobles_reservas(inicio_prueba)
+
+    def _reportar(self, metricas, transcurrido):
+        self.stdout.write('')
+        self.stdout.write(f"{'Endpoint':<20}{'Peticiones':>11}{'Req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Errores':>10}")
+        for endpoint in sorted(metricas.latencias):
+            valores = sorted(metricas.latencias[endpoint])
+            total = len(valores)
+            errores = metricas.errores[endpoint]
+            self.stdout.write(
+                f"{endpoint:<20}{total:>11}{total / transcurrido:>9.1f}"
+                f"{percentil(valores, 50) * 1000:>9.1f}{percentil(valores, 95) * 1000:>9.1f}"
+                f"{percentil(valores, 99) * 1000:>9.1f}{errores / total * 100:>9.1f}%"
+            )
+        total_peticiones = sum(len(v) for v in metricas.latencias.values())
+        self.stdout.write(f"\nTotal: {total_peticiones} peticiones en {transcurrido:.1f}s ({total_peticiones / transcurrido:.1f} req/s)")
+        for resultado, cantidad in sorted(metricas.resultados.items()):
+            self.stdout.write(f"  {resultado}: {cantidad}")
+
+    def _verificar_dobles_reservas(self, inicio_prueba):
+        """
+        Busca reservas creadas durante la prueba que se traslapan con otra de la misma sala
+        """
+        traslape = Reserva.objects.filter(
+            sala=OuterRef('sala'),
+            fecha_hora_inicio__lt=OuterRef('fecha_hora_termino'),
+            fecha_hora_termino__gt=OuterRef('fecha_hora_inicio'),
+        ).exclude(pk=OuterRef('pk'))
+
+        conflictos = (
+            Reserva.objects.filter(fecha_hora_inicio__gte=inicio_prueba)
+            .annotate(traslapada=Exists(traslape))
+            .filter(traslapada=True)
+            .select_related('sala')
+        )
+
+        total = conflictos.count()
+        if total:
+            self.stdout.write(self.style.ERROR(f'\n{total} reservas traslapadas (doble reserva) detectadas:'))
+            for reserva in conflictos[:20]:
+                self.stdout.write(f"  #{reserva.id} {reserva.sala.nombre}: {reserva.fecha_hora_inicio:%H:%M:%S} - {reserva.fecha_hora_termino:%H:%M:%S}")
+        else:
+            self.stdout.write(self.style.SUCCESS('\nSin dobles reservas.'))
@@ -0,0 +1,130 @@
+import logging
+import mimetypes
+import os
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+
+class MedicionRenderMiddleware:
+    """
+    Modo de medición (MEDIR_RENDER=True): separa el tiempo de consultas del tiempo
+    de render de plantillas y lo informa en la cabecera Server-Timing y en el log.
+
+    El render solo se mide por separado en vistas que devuelven TemplateResponse.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion = {'db': 0.0, 'consultas': 0}
+        request._medicion = medicion
+
+        def medir_consulta(execute, sql, params, many, context):
+            inicio = perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                medicion['db'] += perf_counter() - inicio
+                medicion['consultas'] += 1
+
+        inicio = perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medir_consulta))
+            response = self.get_response(request)
+        total = perf_counter() - inicio
+
+        partes = [f'db;dur={medicion["db"] * 1000:.1f};desc="{medicion["consultas"]} consultas"']
+        if 'render' in medicion:
+            partes.append(f'render;dur={medicion["render"] * 1000:.1f}')
+        partes.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(partes)
+
+        logger.info(
+            '%s db=%.1fms (%s consultas) render=%s total=%.1fms',
+            request.path, medicion['db'] * 1000, medicion['consultas'],
+            f'{medicion["render"] * 1000:.1f}ms' if 'render' in medicion else '-', total * 1000,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        medicion = getattr(request, '_medicion', None)
+        if medicion is None:
+            return response
+        # Las consultas perezosas evaluadas dentro de la plantilla cuentan como db
+        db_antes = medicion['db']
+        inicio = perf_counter()
+        response.render()
+        medicion['render'] = perf_counter() - inicio - (medicion['db'] - db_antes)
+        return response
+
+
+class EstaticosMiddleware:
+    """
+    Sirve STATIC_ROOT cuando no hay un servidor web delante (SERVIR_ESTATICOS=True).
+
+    Entrega la variante .br o .gz precomprimida según Accept-Encoding. Los nombres
+    con hash del manifiesto se marcan como inmutables por un año: el navegador no
+    vuelve a pedirlos mientras no cambie su contenido.
+    """
+
+    inmutable = 'public, max-age=31536000, immutable'
+    revalidar = 'public, max-age=0, must-revalidate'
+    variantes = [('br', '.br'), ('gzip', '.gz')]
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefijo = '/' + settings.STATIC_URL.lstrip('/')
+        self.raiz = str(settings.STATIC_ROOT)
+        self._con_hash = None
+
+    def _nombres_con_hash(self):
+        if self._con_hash is None:
+            self._con_hash = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return self._con_hash
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefijo):
+            return self.get_response(request)
+
+        nombre = request.path[len(self.prefijo):]
+        try:
+            ruta = safe_join(self.raiz, nombre)
+        except ValueError:
+            return self.get_response(request)
+        if not os.path.isfile(ruta):
+            return self.get_response(request)
+
+        tipo, _ = mimetypes.guess_type(ruta)
+        aceptadas = request.headers.get('Accept-Encoding', '')
+        servida, codificacion = ruta, None
+        for nombre_codificacion, extension in self.variantes:
+            if nombre_codificacion in aceptadas and os.path.isfile(ruta + extension):
+                servida, codificacion = ruta + extension, nombre_codificacion
+                break
+
+        estado = os.stat(servida)
+        con_hash = nombre in self._nombres_con_hash()
+        if not con_hash:
+            modificado = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            if modificado is not None and int(estado.st_mtime) <= modificado:
+                return HttpResponseNotModified()
+
+        response = FileResponse(open(servida, 'rb'), content_type=tipo or 'application/octet-stream')
+        if codificacion:
+            response['Content-Encoding'] = codificacion
+        response['Content-Length'] = estado.st_size
+        response['Last-Modified'] = http_date(estado.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = self.inmutable if con_hash else self.revalidar
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0002_reserva_duracion_minutos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['fecha_hora_inicio'], name='reservas_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['sala', 'fecha_hora_inicio', 'fecha_hora_termino'], name='reservas_sala_rango_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0003_indices_reservas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.CharField(max_length=150)),
+                ('accion', models.CharField(choices=[('crear_reserva', 'Reserva creada'), ('reducir_reserva', 'Reserva acortada'), ('finalizar_reserva', 'Reserva finalizada'), ('eliminar_reserva', 'Reserva eliminada'), ('crear_sala', 'Sala creada'), ('editar_sala', 'Sala editada'), ('eliminar_sala', 'Sala eliminada')], max_length=30)),
+                ('modelo', models.CharField(max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('antes', models.JSONField(blank=True, null=True)),
+                ('despues', models.JSONField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'auditoria',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def crear_sede_inicial(apps, schema_editor):
+    """
+    Asigna las salas y reservas existentes a una sede inicial
+    """
+    Sede = apps.get_model('reservas', 'Sede')
+    Sala = apps.get_model('reservas', 'Sala')
+    Reserva = apps.get_model('reservas', 'Reserva')
+
+    sede, _ = Sede.objects.get_or_create(slug='central', defaults={'nombre': 'Sede Central'})
+    Sala.objects.filter(sede__isnull=True).update(sede=sede)
+    Reserva.objects.filter(sede__isnull=True).update(sede=sede)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reservas', '0004_registro_auditoria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sede',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+            options={
+                'db_table': 'sedes',
+            },
+        ),
+        migrations.CreateModel(
+            name='PerfilStaff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='reservas.sede')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='perfil_staff', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'perfiles_staff',
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='sede',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='reservas.sede'),
+        ),
+        migrations.AddField(
+            model_name='sala',
+            name='sede',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='reservas.sede'),
+        ),
+        migrations.RunPython(crear_sede_inicial, migrations.RunPython.noop),
+    ]
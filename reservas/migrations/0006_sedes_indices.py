@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0005_sedes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroauditoria',
+            name='sede',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='reservas.sede'),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='sede',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, to='reservas.sede'),
+        ),
+        migrations.AlterField(
+            model_name='sala',
+            name='nombre',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='sala',
+            name='sede',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='reservas.sede'),
+        ),
+        migrations.AddIndex(
+            model_name='registroauditoria',
+            index=models.Index(fields=['sede', '-id'], name='auditoria_sede_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['sede', 'fecha_hora_inicio'], name='reservas_sede_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['sede', 'fecha_hora_termino'], name='reservas_sede_termino_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sala',
+            index=models.Index(fields=['sede', 'habilitada', 'nombre'], name='salas_sede_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sala',
+            constraint=models.UniqueConstraint(fields=('sede', 'nombre'), name='salas_sede_nombre_uniq'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0006_sedes_indices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registroauditoria',
+            name='accion',
+            field=models.CharField(choices=[('crear_reserva', 'Reserva creada'), ('reducir_reserva', 'Reserva acortada'), ('finalizar_reserva', 'Reserva finalizada'), ('eliminar_reserva', 'Reserva eliminada'), ('crear_sala', 'Sala creada'), ('editar_sala', 'Sala editada'), ('eliminar_sala', 'Sala eliminada'), ('crear_serie', 'Serie creada'), ('editar_serie', 'Serie editada'), ('cancelar_serie', 'Serie cancelada')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='SerieReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rut_reservante', models.CharField(max_length=12)),
+                ('frecuencia', models.CharField(choices=[('diaria', 'Diaria'), ('semanal', 'Semanal')], default='semanal', max_length=10)),
+                ('hora_inicio', models.TimeField()),
+                ('duracion_minutos', models.IntegerField(default=120)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('excepciones', models.JSONField(blank=True, default=list)),
+                ('activa', models.BooleanField(default=True)),
+                ('creada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sala', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reservas.sala')),
+                ('sede', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, to='reservas.sede')),
+            ],
+            options={
+                'db_table': 'series_reservas',
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='serie',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='reservas.seriereserva'),
+        ),
+        migrations.AddIndex(
+            model_name='seriereserva',
+            index=models.Index(fields=['sede', 'activa'], name='series_sede_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0007_series_reservas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoSala',
+            fields=[
+                ('sala', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pronostico', serialize=False, to='reservas.sala')),
+                ('matriz', models.BinaryField()),
+                ('semanas', models.PositiveIntegerField()),
+                ('calculado', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'pronosticos',
+            },
+        ),
+    ]
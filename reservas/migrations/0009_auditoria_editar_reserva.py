@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0008_pronosticos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registroauditoria',
+            name='accion',
+            field=models.CharField(choices=[('crear_reserva', 'Reserva creada'), ('editar_reserva', 'Reserva editada'), ('reducir_reserva', 'Reserva acortada'), ('finalizar_reserva', 'Reserva finalizada'), ('eliminar_reserva', 'Reserva eliminada'), ('crear_sala', 'Sala creada'), ('editar_sala', 'Sala editada'), ('eliminar_sala', 'Sala eliminada'), ('crear_serie', 'Serie creada'), ('editar_serie', 'Serie editada'), ('cancelar_serie', 'Serie cancelada')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:17
+
+from django.db import migrations, models
+
+
+def marcar_desde_auditoria(apps, schema_editor):
+    """
+    Marca las reservas que el personal ya acortó o finalizó según la auditoría
+    """
+    Reserva = apps.get_model('reservas', 'Reserva')
+    RegistroAuditoria = apps.get_model('reservas', 'RegistroAuditoria')
+
+    acortadas = RegistroAuditoria.objects.filter(
+        modelo='reserva', accion__in=['reducir_reserva', 'finalizar_reserva'],
+    ).values('objeto_id')
+    Reserva.objects.filter(id__in=acortadas).update(finalizada_antes=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0009_auditoria_editar_reserva'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='finalizada_antes',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(marcar_desde_auditoria, migrations.RunPython.noop),
+    ]
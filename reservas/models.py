@@ -1,20 +1,81 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
 
+
+class Sede(models.Model):
+    nombre = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=50, unique=True)
+
+    class Meta:
+        db_table = 'sedes'
+
+    def __str__(self):
+        return self.nombre
+
+
+class PerfilStaff(models.Model):
+    """
+    Sede a la que pertenece un funcionario; solo ve y gestiona los datos de esa sede
+    """
+    usuario = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='perfil_staff')
+    sede = models.ForeignKey(Sede, on_delete=models.PROTECT)
+
+    class Meta:
+        db_table = 'perfiles_staff'
+
+    def __str__(self):
+        return f"{self.usuario} ({self.sede})"
+
+
+class SalaQuerySet(models.QuerySet):
+    def con_disponibilidad(self):
+        """
+        Anota si la sala tiene una reserva en curso, evitando una consulta por sala
+        """
+        ahora = timezone.now()
+        return self.annotate(
+            ocupada_ahora=models.Exists(
+                Reserva.objects.filter(
+                    sala=models.OuterRef('pk'),
+                    fecha_hora_inicio__lte=ahora,
+                    fecha_hora_termino__gte=ahora,
+                )
+            )
+        )
+
+    def bloquear(self):
+        """
+        Bloquea las filas de las salas hasta el fin de la transacción. Todo lo que
+        inserta reservas (lotes, guardado directo, reservas manuales, series) lo
+        toma antes de verificar conflictos; el orden por id evita interbloqueos.
+        """
+        return self.select_for_update().order_by('id')
+
+
 class Sala(models.Model):
     ESTADOS = [
         ('disponible', 'Disponible'),
         ('mantenimiento', 'En Mantenimiento'),
     ]
     
-    nombre = models.CharField(max_length=100, unique=True)
+    sede = models.ForeignKey(Sede, on_delete=models.PROTECT)
+    nombre = models.CharField(max_length=100)
     capacidad_maxima = models.IntegerField()
     estado = models.CharField(max_length=20, choices=ESTADOS, default='disponible')
     habilitada = models.BooleanField(default=True)
+
+    objects = SalaQuerySet.as_manager()
     
     class Meta:
         db_table = 'salas' 
+        constraints = [
+            models.UniqueConstraint(fields=['sede', 'nombre'], name='salas_sede_nombre_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['sede', 'habilitada', 'nombre'], name='salas_sede_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} (Capacidad: {self.capacidad_maxima})"
@@ -24,6 +85,10 @@ class Sala(models.Model):
         if not self.habilitada or self.estado != 'disponible':
             return False
         
+        # Si la sala viene de con_disponibilidad() no es necesario consultar
+        if hasattr(self, 'ocupada_ahora'):
+            return not self.ocupada_ahora
+        
         ahora = timezone.now()
         reserva_activa = self.reserva_set.filter(
             fecha_hora_inicio__lte=ahora,
@@ -35,14 +100,28 @@ class Sala(models.Model):
 class Reserva(models.Model):
     rut_reservante = models.CharField(max_length=12)
     sala = models.ForeignKey(Sala, on_delete=models.CASCADE)
+    # Copia de sala.sede para filtrar e indexar por sede sin JOIN
+    sede = models.ForeignKey(Sede, on_delete=models.PROTECT, editable=False)
     fecha_hora_inicio = models.DateTimeField(default=timezone.now)
     fecha_hora_termino = models.DateTimeField()
     duracion_minutos = models.IntegerField(default=120)  # Nueva campo para duración
+    serie = models.ForeignKey('SerieReserva', on_delete=models.SET_NULL, null=True, blank=True, editable=False)
+    # La marca el personal al acortar o finalizar la reserva; la usan los reportes
+    finalizada_antes = models.BooleanField(default=False, editable=False)
     
     class Meta:
         db_table = 'reservas'
+        indexes = [
+            models.Index(fields=['fecha_hora_inicio'], name='reservas_inicio_idx'),
+            models.Index(fields=['sala', 'fecha_hora_inicio', 'fecha_hora_termino'], name='reservas_sala_rango_idx'),
+            models.Index(fields=['sede', 'fecha_hora_inicio'], name='reservas_sede_inicio_idx'),
+            models.Index(fields=['sede', 'fecha_hora_termino'], name='reservas_sede_termino_idx'),
+        ]
     
     def save(self, *args, **kwargs):
+        if self.sala_id and not self.sede_id:
+            self.sede_id = self.sala.sede_id
+        
     # Si se proporciona duración, calcular término
         if not self.fecha_hora_termino and hasattr(self, 'duracion_minutos'):
             self.fecha_hora_termino = self.fecha_hora_inicio + timedelta(minutes=self.duracion_minutos)
@@ -118,4 +197,115 @@ def tiempo_restante(self):
 def esta_activa(self):
     from django.utils import timezone
     ahora = timezone.now()
-    return self.fecha_hora_inicio <= ahora <= self.fecha_hora_termino
\ No newline at end of file
+    return self.fecha_hora_inicio <= ahora <= self.fecha_hora_termino
+
+class RegistroAuditoria(models.Model):
+    ACCIONES = [
+        ('crear_reserva', 'Reserva creada'),
+        ('editar_reserva', 'Reserva editada'),
+        ('reducir_reserva', 'Reserva acortada'),
+        ('finalizar_reserva', 'Reserva finalizada'),
+        ('eliminar_reserva', 'Reserva eliminada'),
+        ('crear_sala', 'Sala creada'),
+        ('editar_sala', 'Sala editada'),
+        ('eliminar_sala', 'Sala eliminada'),
+        ('crear_serie', 'Serie creada'),
+        ('editar_serie', 'Serie editada'),
+        ('cancelar_serie', 'Serie cancelada'),
+    ]
+
+    fecha = models.DateTimeField(default=timezone.now)
+    sede = models.ForeignKey(Sede, on_delete=models.SET_NULL, null=True, blank=True)
+    actor = models.CharField(max_length=150)
+    accion = models.CharField(max_length=30, choices=ACCIONES)
+    modelo = models.CharField(max_length=30)
+    objeto_id = models.BigIntegerField()
+    antes = models.JSONField(null=True, blank=True)
+    despues = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'auditoria'
+        indexes = [
+            models.Index(fields=['sede', '-id'], name='auditoria_sede_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_accion_display()} #{self.objeto_id} por {self.actor}"
+
+
+
+class SerieReserva(models.Model):
+    """
+    Reserva recurrente (grupos de estudio, tutorías) que se expande en ocurrencias de Reserva
+    """
+    FRECUENCIAS = [
+        ('diaria', 'Diaria'),
+        ('semanal', 'Semanal'),
+    ]
+
+    sala = models.ForeignKey(Sala, on_delete=models.CASCADE)
+    sede = models.ForeignKey(Sede, on_delete=models.PROTECT, editable=False)
+    rut_reservante = models.CharField(max_length=12)
+    frecuencia = models.CharField(max_length=10, choices=FRECUENCIAS, default='semanal')
+    hora_inicio = models.TimeField()
+    duracion_minutos = models.IntegerField(default=120)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    excepciones = models.JSONField(default=list, blank=True)  # Fechas ISO sin ocurrencia
+    activa = models.BooleanField(default=True)
+    creada = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'series_reservas'
+        indexes = [
+            models.Index(fields=['sede', 'activa'], name='series_sede_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.sala_id and not self.sede_id:
+            self.sede_id = self.sala.sede_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Serie {self.get_frecuencia_display().lower()} {self.sala.nombre} - {self.rut_reservante}"
+
+    def fechas(self, desde=None, hasta=None):
+        """
+        Fechas de las ocurrencias entre desde y hasta (por defecto, toda la serie), sin excepciones
+        """
+        paso = timedelta(days=1 if self.frecuencia == 'diaria' else 7)
+        excepciones = set(self.excepciones or [])
+        fecha = self.fecha_inicio
+        while fecha <= (hasta or self.fecha_fin):
+            if (desde is None or fecha >= desde) and fecha.isoformat() not in excepciones:
+                yield fecha
+            fecha += paso
+
+    def ocurrencias(self, desde=None, hasta=None):
+        """
+        Lista de (inicio, termino) con hora local de cada ocurrencia
+        """
+        from datetime import datetime
+        duracion = timedelta(minutes=self.duracion_minutos)
+        resultado = []
+        for fecha in self.fechas(desde, hasta):
+            inicio = timezone.make_aware(datetime.combine(fecha, self.hora_inicio))
+            resultado.append((inicio, inicio + duracion))
+        return resultado
+
+class PronosticoSala(models.Model):
+    """
+    Pronóstico de ocupación calculado por calcular_pronostico, guardado en la base
+    de datos para que lo lean todos los procesos web
+    """
+    sala = models.OneToOneField(Sala, on_delete=models.CASCADE, primary_key=True, related_name='pronostico')
+    # Matriz float32 de 7 días x 96 bloques de 15 minutos
+    matriz = models.BinaryField()
+    semanas = models.PositiveIntegerField()
+    calculado = models.DateTimeField()
+
+    class Meta:
+        db_table = 'pronosticos'
+
+    def __str__(self):
+        return f"Pronóstico {self.sala_id} ({self.calculado:%d/%m/%Y})"
@@ -0,0 +1,135 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import PronosticoSala, Reserva, Sala
+
+MINUTOS_BLOQUE = 15
+BLOQUES_DIA = 24 * 60 // MINUTOS_BLOQUE
+SEGUNDOS_BLOQUE = MINUTOS_BLOQUE * 60
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def _clave(sala_id):
+    return f'reservas:pronostico:sala:{sala_id}'
+
+
+def _desfases_locales(primer_dia, cantidad_dias):
+    """
+    Desfase UTC -> hora local (en segundos) de cada día del historial.
+    Se calcula una vez por día, no por reserva.
+    """
+    zona = timezone.get_current_timezone()
+    return np.array([
+        zona.utcoffset(datetime.combine(primer_dia + timedelta(days=d), time(12))).total_seconds()
+        for d in range(cantidad_dias)
+    ])
+
+
+def calcular_pronostico(dias=365, sala_ids=None):
+    """
+    Calcula para cada sala la probabilidad de ocupación por día de la semana
+    y bloque de 15 minutos, usando las semanas completas del historial.
+
+    Devuelve {sala_id: matriz (7, BLOQUES_DIA)} y la guarda en la tabla
+    pronosticos, que leen todos los procesos web.
+    """
+    hoy = timezone.localdate()
+    # Semanas completas de lunes a domingo que terminan antes de la semana actual
+    fin_local = hoy - timedelta(days=hoy.weekday())
+    inicio_local = fin_local - timedelta(weeks=max(1, dias // 7))
+    cantidad_dias = (fin_local - inicio_local).days
+    semanas = cantidad_dias // 7
+    total_bloques = cantidad_dias * BLOQUES_DIA
+
+    inicio = timezone.make_aware(datetime.combine(inicio_local, time.min))
+    fin = timezone.make_aware(datetime.combine(fin_local, time.min))
+
+    if sala_ids is None:
+        sala_ids = list(Sala.objects.order_by('id').values_list('id', flat=True))
+    salas = np.array(sorted(sala_ids), dtype=np.int64)
+    if not len(salas):
+        return {}
+
+    filas = Reserva.objects.filter(
+        sala_id__in=salas.tolist(),
+        fecha_hora_inicio__lt=fin,
+        fecha_hora_termino__gt=inicio,
+    ).values_list('sala_id', 'fecha_hora_inicio', 'fecha_hora_termino')
+
+    datos = np.array(
+        [(sala_id, ini.timestamp(), ter.timestamp()) for sala_id, ini, ter in filas.iterator(chunk_size=10000)],
+        dtype=np.float64,
+    ).reshape(-1, 3)
+
+    ocupacion = np.zeros((len(salas), total_bloques), dtype=bool)
+    if len(datos):
+        # Pasar los instantes UTC a hora local con el desfase del día correspondiente
+        base_utc = inicio.timestamp()
+        base_local = datetime.combine(inicio_local, time.min, tzinfo=dt_timezone.utc).timestamp()
+        desfases = _desfases_locales(inicio_local, cantidad_dias)
+
+        def a_bloque(instantes, redondeo):
+            dia = np.clip(((instantes - base_utc) // 86400).astype(np.int64), 0, cantidad_dias - 1)
+            locales = instantes + desfases[dia] - base_local
+            return np.clip(redondeo(locales / SEGUNDOS_BLOQUE).astype(np.int64), 0, total_bloques)
+
+        indice_sala = np.searchsorted(salas, datos[:, 0].astype(np.int64))
+        bloque_inicio = a_bloque(datos[:, 1], np.floor)
+        bloque_fin = a_bloque(datos[:, 2], np.ceil)
+        validas = bloque_fin > bloque_inicio
+
+        # Expansión intervalo -> bloques sin recorrer reservas: +1 al inicio,
+        # -1 al término y suma acumulada por sala
+        ancho = total_bloques + 1
+        marcas = (
+            np.bincount(indice_sala[validas] * ancho + bloque_inicio[validas], minlength=len(salas) * ancho)
+            - np.bincount(indice_sala[validas] * ancho + bloque_fin[validas], minlength=len(salas) * ancho)
+        ).reshape(len(salas), ancho)
+        ocupacion = np.cumsum(marcas[:, :-1], axis=1) > 0
+
+    # (salas, semanas, 7 días, bloques) -> promedio sobre las semanas
+    probabilidades = ocupacion.reshape(len(salas), semanas, 7, BLOQUES_DIA).mean(axis=1).astype(np.float32)
+
+    calculado = timezone.now()
+    resultado = {int(sala_id): probabilidades[i] for i, sala_id in enumerate(salas)}
+    PronosticoSala.objects.bulk_create(
+        [PronosticoSala(sala_id=sala_id, matriz=matriz.tobytes(), semanas=semanas, calculado=calculado)
+         for sala_id, matriz in resultado.items()],
+        update_conflicts=True,
+        unique_fields=['sala'],
+        update_fields=['matriz', 'semanas', 'calculado'],
+    )
+    cache.delete_many([_clave(sala_id) for sala_id in resultado])
+    return resultado
+
+
+def obtener_pronostico(sala_id):
+    """
+    Pronóstico de una sala: caché local por unos minutos, luego la tabla
+    pronosticos y, si la sala aún no tiene, se calcula solo para ella
+    """
+    datos = cache.get(_clave(sala_id))
+    if datos is not None:
+        return datos
+
+    fila = PronosticoSala.objects.filter(sala_id=sala_id).first()
+    if fila is None:
+        calcular_pronostico(sala_ids=[sala_id])
+        fila = PronosticoSala.objects.get(sala_id=sala_id)
+
+    datos = {
+        'matriz': np.frombuffer(bytes(fila.matriz), dtype=np.float32).reshape(7, BLOQUES_DIA),
+        'calculado': fila.calculado,
+        'semanas': fila.semanas,
+    }
+    # Expira para que cada proceso vea el recálculo programado del comando
+    cache.set(_clave(sala_id), datos, timeout=settings.PRONOSTICO_CACHE_SEGUNDOS)
+    return datos
+
+
+def bloque_de_hora(hora, minuto=0):
+    return (hora * 60 + minuto) // MINUTOS_BLOQUE
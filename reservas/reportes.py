@@ -0,0 +1,105 @@
+# Cálculo de los reportes mensuales de uso por sala.
+# Estas funciones corren dentro de un ProcessPoolExecutor: solo reciben y
+# devuelven datos serializables.
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+
+def inicializar_worker():
+    """
+    Prepara Django en el proceso hijo y garantiza que abra su propia conexión
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'biblioteca.settings')
+    import django
+    django.setup()
+
+    from django.db import connections
+    connections.close_all()
+
+
+def calcular_tramo(sala_id, inicio, fin):
+    """
+    Recorre en streaming las reservas de una sala que comienzan en [inicio, fin)
+    y devuelve los agregados parciales del tramo
+    """
+    from .models import Reserva
+
+    filas = Reserva.objects.filter(
+        sala_id=sala_id,
+        fecha_hora_inicio__gte=inicio,
+        fecha_hora_inicio__lt=fin,
+    ).values_list('fecha_hora_inicio', 'fecha_hora_termino', 'duracion_minutos', 'finalizada_antes').iterator(chunk_size=2000)
+
+    cantidad = 0
+    minutos_totales = 0
+    suma_duracion = 0
+    finalizaciones_anticipadas = 0
+    minutos_por_hora = Counter()
+    por_dia = Counter()
+    minutos_por_dia = Counter()
+
+    for inicio_reserva, termino_reserva, duracion, finalizada_antes in filas:
+        inicio_local = timezone.localtime(inicio_reserva)
+        minutos = max(0, int((termino_reserva - inicio_reserva).total_seconds() // 60))
+
+        cantidad += 1
+        minutos_totales += minutos
+        suma_duracion += duracion
+        if finalizada_antes:
+            finalizaciones_anticipadas += 1
+
+        dia = inicio_local.date().isoformat()
+        por_dia[dia] += 1
+        minutos_por_dia[dia] += minutos
+
+        # Repartir los minutos ocupados entre las horas del día que abarca la reserva
+        cursor = inicio_local
+        termino_local = timezone.localtime(termino_reserva)
+        while cursor < termino_local:
+            siguiente_hora = (cursor + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+            tramo = min(siguiente_hora, termino_local) - cursor
+            minutos_por_hora[cursor.hour] += tramo.total_seconds() / 60
+            cursor = siguiente_hora
+
+    return {
+        'sala_id': sala_id,
+        'cantidad': cantidad,
+        'minutos_totales': minutos_totales,
+        'suma_duracion': suma_duracion,
+        'finalizaciones_anticipadas': finalizaciones_anticipadas,
+        'minutos_por_hora': dict(minutos_por_hora),
+        'por_dia': dict(por_dia),
+        'minutos_por_dia': dict(minutos_por_dia),
+    }
+
+
+def combinar_tramos(tramos):
+    """
+    Suma los agregados parciales de una misma sala
+    """
+    total = {
+        'cantidad': 0,
+        'minutos_totales': 0,
+        'suma_duracion': 0,
+        'finalizaciones_anticipadas': 0,
+        'minutos_por_hora': Counter(),
+        'por_dia': Counter(),
+        'minutos_por_dia': Counter(),
+    }
+    for tramo in tramos:
+        for clave in ('cantidad', 'minutos_totales', 'suma_duracion', 'finalizaciones_anticipadas'):
+            total[clave] += tramo[clave]
+        for clave in ('minutos_por_hora', 'por_dia', 'minutos_por_dia'):
+            total[clave].update(tramo[clave])
+
+    cantidad = total['cantidad']
+    total['horas_reservadas'] = round(total['minutos_totales'] / 60, 1)
+    total['duracion_promedio'] = round(total['suma_duracion'] / cantidad, 1) if cantidad else 0
+    total['horas_punta'] = [hora for hora, _ in total['minutos_por_hora'].most_common(3)]
+    total['dias'] = [
+        {'fecha': dia, 'reservas': total['por_dia'][dia], 'horas': round(total['minutos_por_dia'][dia] / 60, 1)}
+        for dia in sorted(total['por_dia'])
+    ]
+    return total
@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Reserva, Sala
+from .versiones import registrar_cambio
+
+
+def buscar_conflictos(sala, ocurrencias, excluir_serie=None):
+    """
+    Devuelve {indice: [reservas en conflicto]} para las ocurrencias (inicio, termino)
+    dadas, comparándolas todas contra las reservas de la sala en una sola consulta
+    (lista VALUES unida por traslape)
+    """
+    if not ocurrencias:
+        return {}
+
+    tabla = connection.ops.quote_name(Reserva._meta.db_table)
+    adaptar = connection.ops.adapt_datetimefield_value
+    # SQLite limita la cantidad de parámetros; PostgreSQL no (max_query_params = None)
+    maximo = connection.features.max_query_params
+    por_consulta = (maximo - 2) // 3 if maximo else len(ocurrencias)
+
+    conflictos = {}
+    with connection.cursor() as cursor:
+        for desde in range(0, len(ocurrencias), por_consulta):
+            tramo = ocurrencias[desde:desde + por_consulta]
+            valores = ', '.join(['(%s, %s, %s)'] * len(tramo))
+            parametros = []
+            for indice, (inicio, termino) in enumerate(tramo, start=desde):
+                parametros.extend([indice, adaptar(inicio), adaptar(termino)])
+            parametros.append(sala.id)
+
+            sql = (
+                f'WITH ocurrencias (indice, inicio, termino) AS (VALUES {valores}) '
+                f'SELECT o.indice, r.id, r.fecha_hora_inicio, r.fecha_hora_termino '
+                f'FROM ocurrencias o JOIN {tabla} r '
+                f'ON r.sala_id = %s AND r.fecha_hora_inicio < o.termino AND r.fecha_hora_termino > o.inicio'
+            )
+            if excluir_serie is not None:
+                sql += ' WHERE r.serie_id IS NULL OR r.serie_id <> %s'
+                parametros.append(excluir_serie.id)
+
+            cursor.execute(sql, parametros)
+            for indice, reserva_id, inicio, termino in cursor.fetchall():
+                conflictos.setdefault(indice, []).append(reserva_id)
+    return conflictos
+
+
+def _nuevas_reservas(serie, ocurrencias):
+    return [
+        Reserva(
+            rut_reservante=serie.rut_reservante,
+            sala_id=serie.sala_id,
+            sede_id=serie.sede_id,
+            serie=serie,
+            fecha_hora_inicio=inicio,
+            fecha_hora_termino=termino,
+            duracion_minutos=serie.duracion_minutos,
+        )
+        for inicio, termino in ocurrencias
+    ]
+
+
+def _bloquear_sala(serie):
+    # Mismo bloqueo que toman las demás escrituras de reservas (ver Sala.objects.bloquear)
+    list(Sala.objects.bloquear().filter(id=serie.sala_id))
+
+
+def _notificar_cambio(serie):
+    # bulk_create, update y _raw_delete no emiten señales: invalidar a mano
+    sala_id, sede_id = serie.sala_id, serie.sede_id
+    transaction.on_commit(lambda: registrar_cambio(sala_id, sede_id))
+
+
+def crear_serie(serie):
+    """
+    Guarda la serie e inserta con bulk_create las ocurrencias sin conflicto.
+    Devuelve (cantidad_creadas, [(inicio, termino) de las ocurrencias en conflicto])
+    """
+    with transaction.atomic():
+        _bloquear_sala(serie)
+        ahora = timezone.now()
+        ocurrencias = [o for o in serie.ocurrencias(desde=timezone.localdate()) if o[0] > ahora]
+        conflictos = buscar_conflictos(serie.sala, ocurrencias)
+        # Las fechas omitidas quedan como excepciones: así editar_serie no las vuelve a verificar
+        serie.excepciones = sorted(
+            set(serie.excepciones or [])
+            | {timezone.localtime(ocurrencias[i][0]).date().isoformat() for i in conflictos}
+        )
+        serie.save()
+        libres = [o for i, o in enumerate(ocurrencias) if i not in conflictos]
+        Reserva.objects.bulk_create(_nuevas_reservas(serie, libres))
+        _notificar_cambio(serie)
+    return len(libres), [ocurrencias[i] for i in sorted(conflictos)]
+
+
+def cancelar_serie(serie):
+    """
+    Elimina las ocurrencias futuras con un único DELETE y desactiva la serie
+    """
+    with transaction.atomic():
+        futuras = Reserva.objects.filter(serie=serie, fecha_hora_inicio__gt=timezone.now())
+        # delete() cargaría cada fila para emitir post_delete; aquí basta un DELETE por conjunto
+        eliminadas = futuras._raw_delete(futuras.db)
+        serie.activa = False
+        serie.fecha_fin = min(serie.fecha_fin, timezone.localdate())
+        serie.save(update_fields=['activa', 'fecha_fin'])
+        _notificar_cambio(serie)
+    return eliminadas
+
+
+def editar_serie(serie, hora_inicio, duracion_minutos, fecha_fin, excepciones):
+    """
+    Aplica los cambios a las ocurrencias futuras con sentencias por conjunto.
+    Si el nuevo horario choca con otras reservas no se modifica nada y se
+    devuelven las ocurrencias en conflicto.
+    """
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+    original = type(serie).objects.get(pk=serie.pk)
+
+    serie.hora_inicio = hora_inicio
+    serie.duracion_minutos = duracion_minutos
+    serie.fecha_fin = fecha_fin
+    serie.excepciones = sorted(set(excepciones))
+
+    referencia = datetime.combine(hoy, original.hora_inicio)
+    desplazamiento = datetime.combine(hoy, hora_inicio) - referencia
+    duracion = timedelta(minutes=duracion_minutos)
+
+    with transaction.atomic():
+        _bloquear_sala(serie)
+        # Verificar todas las ocurrencias futuras del nuevo horario en una sola consulta
+        ocurrencias = [o for o in serie.ocurrencias(desde=hoy) if o[0] > ahora]
+        conflictos = buscar_conflictos(serie.sala, ocurrencias, excluir_serie=serie)
+        if conflictos:
+            return 0, [ocurrencias[i] for i in sorted(conflictos)]
+
+        futuras = Reserva.objects.filter(serie=serie, fecha_hora_inicio__gt=ahora)
+
+        # Quitar las ocurrencias que quedan fuera de la serie (nuevo término o excepciones)
+        sobrantes = futuras.filter(fecha_hora_inicio__date__gt=fecha_fin)
+        sobrantes._raw_delete(sobrantes.db)
+        if serie.excepciones:
+            fechas_excluidas = [datetime.fromisoformat(f).date() for f in serie.excepciones]
+            excluidas = futuras.filter(fecha_hora_inicio__date__in=fechas_excluidas)
+            excluidas._raw_delete(excluidas.db)
+
+        # Mover el horario de las restantes con un único UPDATE
+        futuras.update(
+            fecha_hora_inicio=F('fecha_hora_inicio') + desplazamiento,
+            fecha_hora_termino=F('fecha_hora_inicio') + desplazamiento + duracion,
+            duracion_minutos=duracion_minutos,
+        )
+
+        # Agregar las ocurrencias nuevas: serie extendida o excepciones retiradas
+        recuperadas = set(original.excepciones or []) - set(serie.excepciones)
+        nuevas = [
+            o for o in ocurrencias
+            if timezone.localtime(o[0]).date() > original.fecha_fin
+            or timezone.localtime(o[0]).date().isoformat() in recuperadas
+        ]
+        Reserva.objects.bulk_create(_nuevas_reservas(serie, nuevas))
+
+        serie.save()
+        _notificar_cambio(serie)
+    return len(nuevas), []
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Reserva, Sala
+from .versiones import registrar_cambio
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+def reserva_modificada(sender, instance, **kwargs):
+    sala_id, sede_id = instance.sala_id, instance.sede_id
+    transaction.on_commit(lambda: registrar_cambio(sala_id, sede_id))
+
+
+@receiver(post_save, sender=Sala)
+@receiver(post_delete, sender=Sala)
+def sala_modificada(sender, instance, **kwargs):
+    sala_id, sede_id = instance.pk, instance.sede_id
+    transaction.on_commit(lambda: registrar_cambio(sala_id, sede_id))
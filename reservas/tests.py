@@ -1,3 +1,282 @@
-from django.test import TestCase
+from concurrent.futures import TimeoutError as FuturoTimeoutError
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import agrupador, series
+from .reportes import calcular_tramo
+from .auditoria import EscritorAuditoria
+from .models import PerfilStaff, RegistroAuditoria, Reserva, Sala, Sede, SerieReserva
+
+
+def _instante(fecha, hora, minuto=0):
+    return timezone.make_aware(datetime.combine(fecha, time(hora, minuto)))
+
+
+class SeriesConflictosTests(TestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(nombre='Sede Pruebas', slug='pruebas')
+        self.sala = Sala.objects.create(sede=self.sede, nombre='Sala A', capacidad_maxima=6)
+        self.manana = timezone.localdate() + timedelta(days=1)
+
+    def _reservar(self, dias, hora, minuto, duracion):
+        inicio = _instante(self.manana + timedelta(days=dias), hora, minuto)
+        return Reserva.objects.create(
+            sala=self.sala, rut_reservante='111111111',
+            fecha_hora_inicio=inicio, fecha_hora_termino=inicio + timedelta(minutes=duracion),
+        )
+
+    def _crear_serie(self, dias=7):
+        serie = SerieReserva(
+            sala=self.sala, rut_reservante='222222222', frecuencia='diaria',
+            hora_inicio=time(10), duracion_minutos=60,
+            fecha_inicio=self.manana, fecha_fin=self.manana + timedelta(days=dias - 1),
+        )
+        return serie, series.crear_serie(serie)
+
+    def test_crear_omite_conflictos_y_los_registra_como_excepciones(self):
+        self._reservar(2, 10, 30, 30)
+        self._reservar(4, 9, 30, 60)
+
+        serie, (creadas, conflictos) = self._crear_serie()
+
+        self.assertEqual(creadas, 5)
+        self.assertEqual(len(conflictos), 2)
+        self.assertEqual(Reserva.objects.filter(serie=serie).count(), 5)
+        self.assertEqual(serie.excepciones, [
+            (self.manana + timedelta(days=2)).isoformat(),
+            (self.manana + timedelta(days=4)).isoformat(),
+        ])
+
+    def test_editar_tras_conflictos_al_crear_extiende_la_serie(self):
+        self._reservar(2, 10, 30, 30)
+        serie, _ = self._crear_serie()
+
+        creadas, conflictos = series.editar_serie(
+            serie, time(10), 60, serie.fecha_fin + timedelta(days=2), serie.excepciones,
+        )
+
+        self.assertEqual(conflictos, [])
+        self.assertEqual(creadas, 2)
+        self.assertEqual(Reserva.objects.filter(serie=serie).count(), 8)
+
+    def test_editar_con_conflicto_no_modifica_nada(self):
+        serie, _ = self._crear_serie()
+        self._reservar(3, 11, 0, 30)
+
+        creadas, conflictos = series.editar_serie(serie, time(10, 30), 60, serie.fecha_fin, [])
+
+        self.assertEqual(creadas, 0)
+        self.assertEqual(conflictos, [(_instante(self.manana + timedelta(days=3), 10, 30),
+                                       _instante(self.manana + timedelta(days=3), 11, 30))])
+        serie.refresh_from_db()
+        self.assertEqual(serie.hora_inicio, time(10))
+        self.assertFalse(
+            Reserva.objects.filter(serie=serie).exclude(fecha_hora_inicio__time=time(10)).exists()
+        )
+
+
+@override_settings(INSTANTANEA_ACTIVA=False)
+@mock.patch('reservas.agrupador.registrar_evento')
+class ConfirmadorReservasTests(TransactionTestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(nombre='Sede Pruebas', slug='pruebas')
+        self.sala = Sala.objects.create(sede=self.sede, nombre='Sala A', capacidad_maxima=6)
+        # Sin hilo: los lotes se confirman a mano dentro de la prueba
+        self.confirmador = agrupador.ConfirmadorReservas(max_cola=10, tamano_lote=10, ventana_ms=0)
+        self.confirmador._iniciar = lambda: None
+
+    def _reserva(self, rut, minutos=60):
+        ahora = timezone.now()
+        return Reserva(sala=self.sala, rut_reservante=rut, fecha_hora_inicio=ahora,
+                       fecha_hora_termino=ahora + timedelta(minutes=minutos), duracion_minutos=minutos)
+
+    def _drenar(self):
+        lote = []
+        while not self.confirmador.cola.empty():
+            lote.append(self.confirmador.cola.get_nowait())
+        self.confirmador._confirmar(lote)
+
+    def test_lote_con_dos_solicitudes_de_la_misma_sala_gana_la_primera(self, registrar_evento):
+        primera = self.confirmador.enviar(self._reserva('111111111'))
+        segunda = self.confirmador.enviar(self._reserva('222222222', minutos=15))
+
+        self._drenar()
+
+        self.assertIs(primera.futuro.result(timeout=0), True)
+        self.assertIs(segunda.futuro.result(timeout=0), False)
+        self.assertEqual(list(Reserva.objects.values_list('rut_reservante', 'sede_id')),
+                         [('111111111', self.sede.id)])
+        registrar_evento.assert_called_once()
+
+    @override_settings(RESERVAS_ESPERA_SEGUNDOS=0)
+    def test_solicitud_vencida_se_cancela_y_no_se_inserta(self, registrar_evento):
+        with mock.patch.object(agrupador, 'confirmador', self.confirmador):
+            with self.assertRaises(FuturoTimeoutError):
+                agrupador.confirmar_reserva(self._reserva('111111111'))
+
+        self._drenar()
+
+        self.assertFalse(Reserva.objects.exists())
+        self.assertEqual(self.confirmador.metricas()['lotes'], 0)
+        registrar_evento.assert_not_called()
+
+    def test_cola_llena_guarda_directo_con_la_misma_verificacion(self, registrar_evento):
+        lleno = agrupador.ConfirmadorReservas(max_cola=1, tamano_lote=1, ventana_ms=0)
+        lleno._iniciar = lambda: None
+        lleno.enviar(self._reserva('000000000'))
+        Reserva.objects.create(sala=self.sala, rut_reservante='999999999',
+                               fecha_hora_inicio=timezone.now() - timedelta(minutes=5),
+                               fecha_hora_termino=timezone.now() + timedelta(minutes=30))
+
+        with mock.patch.object(agrupador, 'confirmador', lleno):
+            self.assertIs(agrupador.confirmar_reserva(self._reserva('111111111')), False)
+
+        self.assertEqual(Reserva.objects.count(), 1)
+
+
+@override_settings(INSTANTANEA_ACTIVA=False)
+class EscritorAuditoriaTests(TransactionTestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(nombre='Sede Pruebas', slug='pruebas')
+
+    def _evento(self, objeto_id):
+        return RegistroAuditoria(sede=self.sede, actor='prueba', accion='crear_sala',
+                                 modelo='sala', objeto_id=objeto_id)
+
+    def test_escribe_los_eventos_en_lotes(self):
+        escritor = EscritorAuditoria(max_cola=10, tamano_lote=2, intervalo_ms=50)
+        for objeto_id in range(3):
+            escritor.registrar(self._evento(objeto_id))
+        escritor.detener()
+
+        self.assertEqual(RegistroAuditoria.objects.count(), 3)
+        metricas = escritor.metricas()
+        self.assertEqual((metricas['escritos'], metricas['descartados']), (3, 0))
+        self.assertEqual(metricas['lotes'], 2)
+
+    def test_un_evento_invalido_no_descarta_el_resto_del_lote(self):
+        escritor = EscritorAuditoria(max_cola=10, tamano_lote=10, intervalo_ms=50)
+
+        with self.assertLogs('reservas.auditoria', level='WARNING'):
+            escritor._escribir([self._evento(1), self._evento(None), self._evento(2)])
+
+        self.assertEqual(sorted(RegistroAuditoria.objects.values_list('objeto_id', flat=True)), [1, 2])
+        metricas = escritor.metricas()
+        self.assertEqual((metricas['escritos'], metricas['descartados']), (2, 1))
+
+    def test_cola_llena_descarta_y_cuenta(self):
+        escritor = EscritorAuditoria(max_cola=1, tamano_lote=10, intervalo_ms=50)
+        escritor._iniciar = lambda: None
+
+        escritor.registrar(self._evento(1))
+        escritor.registrar(self._evento(2))
+
+        self.assertEqual(escritor.metricas()['descartados'], 1)
+
+
+@override_settings(INSTANTANEA_ACTIVA=False)
+class AuditoriaAdminTests(TestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(nombre='Sede Pruebas', slug='pruebas')
+        self.sala = Sala.objects.create(sede=self.sede, nombre='Sala A', capacidad_maxima=6)
+        self.usuario = User.objects.create_superuser('admin_pruebas', '', 'x')
+        self.request = RequestFactory().post('/')
+        self.request.user = self.usuario
+
+    def _eventos_al(self, accion):
+        with mock.patch('reservas.auditoria.escritor') as escritor:
+            accion()
+        return [llamada.args[0] for llamada in escritor.registrar.call_args_list]
+
+    def test_eliminar_reserva_desde_el_admin_conserva_el_id(self):
+        inicio = timezone.now()
+        reserva = Reserva.objects.create(sala=self.sala, rut_reservante='111111111',
+                                         fecha_hora_inicio=inicio, fecha_hora_termino=inicio + timedelta(hours=1))
+        reserva_id = reserva.id
+
+        eventos = self._eventos_al(lambda: site._registry[Reserva].delete_model(self.request, reserva))
+
+        self.assertEqual([(e.accion, e.objeto_id, e.sede_id) for e in eventos],
+                         [('eliminar_reserva', reserva_id, self.sede.id)])
+        self.assertEqual(eventos[0].antes['rut_reservante'], '111111111')
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_eliminar_salas_en_lote_desde_el_admin(self):
+        otra = Sala.objects.create(sede=self.sede, nombre='Sala B', capacidad_maxima=4)
+        ids = {self.sala.id, otra.id}
+
+        eventos = self._eventos_al(
+            lambda: site._registry[Sala].delete_queryset(self.request, Sala.objects.filter(id__in=ids))
+        )
+
+        self.assertEqual({(e.accion, e.objeto_id) for e in eventos},
+                         {('eliminar_sala', sala_id) for sala_id in ids})
+        self.assertFalse(Sala.objects.exists())
+
+
+class AdminPorSedeTests(TestCase):
+    def setUp(self):
+        self.norte = Sede.objects.create(nombre='Sede Norte', slug='norte-pruebas')
+        self.sur = Sede.objects.create(nombre='Sede Sur', slug='sur-pruebas')
+        self.sala_norte = Sala.objects.create(sede=self.norte, nombre='Sala Norte', capacidad_maxima=6)
+        Sala.objects.create(sede=self.sur, nombre='Sala Sur', capacidad_maxima=6)
+        usuario = User.objects.create_user('staff_norte', '', 'x', is_staff=True)
+        PerfilStaff.objects.create(usuario=usuario, sede=self.norte)
+        self.request = RequestFactory().get('/')
+        self.request.user = usuario
+
+    def test_filtros_solo_ofrecen_la_sede_del_funcionario(self):
+        from .admin import FiltroRelacionSede
+
+        modelo_admin = site._registry[Reserva]
+        campo = Reserva._meta.get_field('sala')
+        filtro = FiltroRelacionSede(campo, self.request, {}, Reserva, modelo_admin, 'sala')
+
+        self.assertEqual([sala_id for sala_id, _ in filtro.lookup_choices], [self.sala_norte.id])
+
+    def test_sedes_y_perfiles_solo_para_superusuarios(self):
+        for modelo in (Sede, PerfilStaff):
+            self.assertFalse(site._registry[modelo].has_module_permission(self.request))
+            self.assertFalse(site._registry[modelo].has_change_permission(self.request))
+
+
+@override_settings(INSTANTANEA_ACTIVA=False)
+class FinalizacionesAnticipadasTests(TestCase):
+    def setUp(self):
+        self.sede = Sede.objects.create(nombre='Sede Pruebas', slug='pruebas')
+        self.sala = Sala.objects.create(sede=self.sede, nombre='Sala A', capacidad_maxima=6)
+        usuario = User.objects.create_user('staff_pruebas', '', 'x', is_staff=True)
+        PerfilStaff.objects.create(usuario=usuario, sede=self.sede)
+        self.client.force_login(usuario)
+
+    def _reservar(self, inicio, minutos):
+        return Reserva.objects.create(sala=self.sala, rut_reservante='111111111', fecha_hora_inicio=inicio,
+                                      fecha_hora_termino=inicio + timedelta(minutes=minutos))
+
+    def _tramo(self):
+        ahora = timezone.now()
+        return calcular_tramo(self.sala.id, ahora - timedelta(days=1), ahora + timedelta(days=1))
+
+    @mock.patch('reservas.views.registrar_evento')
+    def test_reducir_y_finalizar_marcan_la_reserva(self, registrar_evento):
+        ahora = timezone.now()
+        acortada = self._reservar(ahora - timedelta(minutes=10), 120)
+        finalizada = self._reservar(ahora - timedelta(minutes=10), 60)
+
+        self.client.get(reverse('reservas:reducir_tiempo_reserva', args=[acortada.id, 30]))
+        self.client.get(reverse('reservas:finalizar_reserva_ahora', args=[finalizada.id]))
+
+        self.assertEqual(set(Reserva.objects.filter(finalizada_antes=True).values_list('id', flat=True)),
+                         {acortada.id, finalizada.id})
+        self.assertEqual(self._tramo()['finalizaciones_anticipadas'], 2)
+
+    def test_duracion_no_estandar_no_cuenta_como_finalizacion(self):
+        self._reservar(timezone.now() - timedelta(hours=3), 45)
+
+        self.assertEqual(self._tramo()['finalizaciones_anticipadas'], 0)
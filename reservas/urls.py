@@ -6,8 +6,18 @@ app_name = 'reservas'
 urlpatterns = [
     # URLs principales para estudiantes
     path('', views.index, name='index'),
+    path('sede/<slug:sede_slug>/', views.index, name='index_sede'),
     path('sala/<int:sala_id>/', views.detalle_sala, name='detalle_sala'),
     path('reservar/<int:sala_id>/', views.reservar_sala, name='reservar_sala'),
+
+    # Disponibilidad probable según el historial
+    path('sala/<int:sala_id>/disponibilidad/', views.disponibilidad_probable, name='disponibilidad_probable'),
+    path('api/salas/<int:sala_id>/pronostico/', views.api_pronostico_sala, name='api_pronostico_sala'),
+
+    # Calendarios iCalendar
+    path('calendario/salas.ics', views.calendario_salas, name='calendario_salas'),
+    path('calendario/sede/<slug:sede_slug>/salas.ics', views.calendario_salas, name='calendario_sede'),
+    path('calendario/sala/<int:sala_id>.ics', views.calendario_sala, name='calendario_sala'),
     
     # URLs del admin
     path('administracion/panel/', views.admin_panel, name='admin_panel'),
@@ -25,4 +35,12 @@ urlpatterns = [
     path('administracion/reservas/eliminar/<int:reserva_id>/', views.eliminar_reserva, name='eliminar_reserva'),
     path('administracion/reservas/reducir/<int:reserva_id>/<int:minutos>/', views.reducir_tiempo_reserva, name='reducir_tiempo_reserva'),
     path('administracion/reservas/finalizar/<int:reserva_id>/', views.finalizar_reserva_ahora, name='finalizar_reserva_ahora'),
+    
+    path('administracion/series/', views.gestion_series, name='gestion_series'),
+    path('administracion/series/crear/', views.crear_serie, name='crear_serie'),
+    path('administracion/series/editar/<int:serie_id>/', views.editar_serie, name='editar_serie'),
+    path('administracion/series/cancelar/<int:serie_id>/', views.cancelar_serie, name='cancelar_serie'),
+    
+    path('administracion/auditoria/', views.registro_auditoria, name='registro_auditoria'),
+    path('administracion/auditoria/metricas/', views.metricas_auditoria, name='metricas_auditoria'),
 ]
\ No newline at end of file
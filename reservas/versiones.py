@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+# Cada sala y cada sede tienen un "sello de versión" en caché que cambia con
+# cualquier reserva o edición que las afecte. Permite responder peticiones
+# condicionales (ETag / Last-Modified) sin consultar la base de datos.
+# Las claves son por sede: un cambio en una sede no invalida a las demás.
+
+
+def _clave(sala_id=None, sede_id=None):
+    if sala_id is not None:
+        return f'reservas:version:sala:{sala_id}'
+    return f'reservas:version:sede:{sede_id}'
+
+
+def _nuevo_sello():
+    ahora = timezone.now()
+    return (f'{ahora.timestamp():.6f}', ahora.replace(microsecond=0))
+
+
+def obtener_version(sala_id=None, sede_id=None):
+    """
+    Devuelve (version, fecha_modificacion) de una sala, o de toda la sede si sala_id es None
+    """
+    clave = _clave(sala_id, sede_id)
+    sello = cache.get(clave)
+    if sello is None:
+        # Sin sello en caché (reinicio, expulsión): se crea uno nuevo, lo que
+        # solo provoca que los clientes descarguen el contenido una vez más
+        cache.add(clave, _nuevo_sello(), timeout=None)
+        sello = cache.get(clave) or _nuevo_sello()
+    return sello
+
+
+def registrar_cambio(sala_id, sede_id):
+    """
+    Invalida la versión de la sala y la de su sede, y republica su instantánea
+    """
+    sello = _nuevo_sello()
+    cache.set_many({_clave(sala_id=sala_id): sello, _clave(sede_id=sede_id): sello}, timeout=None)
+
+    # Las pantallas de la entrada leen una instantánea estática de la sede
+    from .instantanea import programar_publicacion
+    programar_publicacion(sede_id)
+
+
+def obtener_versiones(sala_ids):
+    """
+    Versiones de varias salas con una sola lectura a la caché: {sala_id: version}
+    """
+    claves = {_clave(sala_id=sala_id): sala_id for sala_id in sala_ids}
+    sellos = cache.get_many(list(claves))
+    faltantes = {clave: _nuevo_sello() for clave in claves if clave not in sellos}
+    if faltantes:
+        cache.set_many(faltantes, timeout=None)
+        sellos.update(faltantes)
+    return {claves[clave]: sello[0] for clave, sello in sellos.items()}
@@ -1,31 +1,110 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.contrib import messages
-from .models import Sala, Reserva
-from .forms import ReservaForm
-from datetime import timedelta
+from .models import Sala, Reserva, RegistroAuditoria, Sede, PerfilStaff, SerieReserva
+from .forms import ReservaForm, SerieReservaForm
+from . import series
+from datetime import datetime, time, timedelta
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+import hashlib
+from django.views.decorators.http import condition
+from .auditoria import datos_reserva, datos_sala, datos_serie, escritor, registrar_evento
+from .calendario import generar_ical, reservas_en_ventana
+from .versiones import obtener_version, obtener_versiones
 
 
 def es_staff(user):
     return user.is_staff
 
-def index(request):
+def _actor(request):
+    return request.user.username if request.user.is_authenticated else 'anónimo'
+
+def obtener_sede(request, sede_slug=None):
+    """
+    Sede de las páginas públicas: la indicada en la URL, la guardada en la
+    sesión o la primera sede. La sesión solo se escribe si la sede cambia.
+    """
+    if hasattr(request, '_sede'):
+        return request._sede
+    
+    sede = None
+    if sede_slug:
+        sede = get_object_or_404(Sede, slug=sede_slug)
+        if request.session.get('sede_id') != sede.id:
+            request.session['sede_id'] = sede.id
+    if sede is None and request.session.get('sede_id'):
+        sede = Sede.objects.filter(id=request.session['sede_id']).first()
+    if sede is None:
+        sede = Sede.objects.order_by('id').first()
+    
+    request._sede = sede
+    return sede
+
+def sede_de_feed(sede_slug=None):
+    """
+    Sede de los feeds y pantallas: solo la URL, sin sesión, para que los
+    clientes sin cookies no creen sesiones ni reciban Vary: Cookie
+    """
+    if sede_slug:
+        return get_object_or_404(Sede, slug=sede_slug)
+    return Sede.objects.order_by('id').first()
+
+def sede_del_staff(request):
+    """
+    Sede de las vistas del personal: la de su perfil. Los superusuarios sin
+    perfil usan la sede pública; el resto del personal necesita un perfil.
+    """
+    if hasattr(request, '_sede'):
+        return request._sede
+    
+    perfil = PerfilStaff.objects.select_related('sede').filter(usuario=request.user).first()
+    if perfil:
+        request._sede = perfil.sede
+        return perfil.sede
+    if request.user.is_superuser:
+        return obtener_sede(request)
+    raise PermissionDenied('Tu usuario no tiene una sede asignada. Solicita a un administrador que la configure.')
+
+def _rango_del_dia(fecha):
+    """
+    [medianoche local, medianoche siguiente) para filtrar con reservas_sede_inicio_idx;
+    __date aplica una conversión de zona horaria a la columna y no usa el índice
+    """
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    return inicio, timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+def index(request, sede_slug=None):
     """
     Vista principal que muestra todas las salas disponibles
     """
-    salas = Sala.objects.filter(habilitada=True).order_by('nombre')
+    sede = obtener_sede(request, sede_slug)
+    salas = list(Sala.objects.filter(sede=sede, habilitada=True).con_disponibilidad().order_by('nombre'))
+    versiones = obtener_versiones([sala.id for sala in salas])
     
-    # Verificar disponibilidad de cada sala
+    # Verificar disponibilidad de cada sala; la tarjeta en caché depende de su versión y disponibilidad
     for sala in salas:
         sala.disponible = sala.disponible_para_reserva
+        sala.version = versiones[sala.id]
+    
+    # Firma de la grilla completa: si ninguna tarjeta cambió no se recorre ninguna
+    firma_grilla = hashlib.md5(
+        '|'.join(f'{sala.id}:{sala.version}:{sala.disponible}' for sala in salas).encode()
+    ).hexdigest()
     
     context = {
         'salas': salas,
+        'firma_grilla': firma_grilla,
+        'sede': sede,
+        'sedes': Sede.objects.order_by('nombre'),
         'ahora': timezone.now()
     }
-    return render(request, 'index.html', context)
+    return TemplateResponse(request, 'index.html', context)
 
 def detalle_sala(request, sala_id):
     """
@@ -85,7 +164,12 @@ def reservar_sala(request, sala_id):
             reserva.fecha_hora_termino = timezone.now() + timedelta(minutes=duracion_minutos)
             
             try:
-                reserva.save()
+                from .agrupador import confirmar_reserva, guardar_reserva
+                # Ambos caminos toman el bloqueo de la sala y verifican de nuevo la disponibilidad
+                guardar = confirmar_reserva if settings.RESERVAS_COMMIT_AGRUPADO else guardar_reserva
+                if not guardar(reserva):
+                    messages.error(request, 'Esta sala no está disponible para reservar en este momento.')
+                    return redirect('reservas:detalle_sala', sala_id=sala_id)
                 
                 # Mensaje con la duración seleccionada
                 if duracion_minutos == 120:
@@ -113,41 +197,6 @@ def reservar_sala(request, sala_id):
     }
     return render(request, 'reservar_sala.html', context)
 
-@login_required
-@user_passes_test(es_staff, login_url='/administracion/login/')
-def admin_panel(request):
-    """
-    Panel de administración personalizado para bibliotecarios
-    """
-    # Estadísticas
-    total_salas = Sala.objects.count()
-    salas_disponibles = Sala.objects.filter(habilitada=True, estado='disponible').count()
-    
-    # Calcular salas ocupadas
-    ahora = timezone.now()
-    reservas_activas = Reserva.objects.filter(
-        fecha_hora_inicio__lte=ahora,
-        fecha_hora_termino__gte=ahora
-    ).select_related('sala')
-    
-    salas_ocupadas = reservas_activas.count()
-    
-    # Reservas de hoy
-    hoy = timezone.now().date()
-    reservas_hoy = Reserva.objects.filter(
-        fecha_hora_inicio__date=hoy
-    ).count()
-    
-    context = {
-        'total_salas': total_salas,
-        'salas_disponibles': salas_disponibles,
-        'salas_ocupadas': salas_ocupadas,
-        'reservas_hoy': reservas_hoy,
-        'reservas_activas': reservas_activas,
-    }
-    
-    return render(request, 'admin_panel.html', context)
-
 def es_staff(user):
     """Verifica si el usuario es staff"""
     return user.is_staff
@@ -179,17 +228,22 @@ def admin_logout(request):
     messages.success(request, 'Sesión cerrada correctamente.')
     return redirect('reservas:admin_login') 
 
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
 def admin_panel(request):
     """
     Panel de administración personalizado para bibliotecarios
     """
+    sede = sede_del_staff(request)
+    
     # Estadísticas
-    total_salas = Sala.objects.count()
-    salas_disponibles = Sala.objects.filter(habilitada=True, estado='disponible').count()
+    total_salas = Sala.objects.filter(sede=sede).count()
+    salas_disponibles = Sala.objects.filter(sede=sede, habilitada=True, estado='disponible').count()
     
     # Calcular salas ocupadas
     ahora = timezone.now()
     reservas_activas = Reserva.objects.filter(
+        sede=sede,
         fecha_hora_inicio__lte=ahora,
         fecha_hora_termino__gte=ahora
     ).select_related('sala')
@@ -197,13 +251,16 @@ def admin_panel(request):
     salas_ocupadas = reservas_activas.count()
     
     # Reservas de hoy
-    hoy = timezone.now().date()
+    inicio_dia, fin_dia = _rango_del_dia(timezone.localdate())
     reservas_hoy = Reserva.objects.filter(
-        fecha_hora_inicio__date=hoy
+        sede=sede,
+        fecha_hora_inicio__gte=inicio_dia,
+        fecha_hora_inicio__lt=fin_dia
     ).count()
     
     # Próximas reservas (próximas 2 horas)
     proximas_reservas = Reserva.objects.filter(
+        sede=sede,
         fecha_hora_inicio__gt=ahora,
         fecha_hora_inicio__lte=ahora + timezone.timedelta(hours=2)
     ).select_related('sala').order_by('fecha_hora_inicio')
@@ -215,6 +272,7 @@ def admin_panel(request):
         'reservas_hoy': reservas_hoy,
         'reservas_activas': reservas_activas,
         'proximas_reservas': proximas_reservas,
+        'sede': sede,
         'usuario_actual': request.user,
     }
     
@@ -226,13 +284,15 @@ def gestion_salas(request):
     """
     Vista para gestionar salas (reemplaza /admin/reservas/sala/)
     """
-    salas = Sala.objects.all().order_by('nombre')
+    sede = sede_del_staff(request)
+    salas = Sala.objects.filter(sede=sede).order_by('nombre')
     
     if request.method == 'POST':
         pass
     
     context = {
         'salas': salas,
+        'sede': sede,
         'usuario_actual': request.user,
     }
     return render(request, 'gestion_salas.html', context)
@@ -250,12 +310,14 @@ def crear_sala(request):
         habilitada = request.POST.get('habilitada') == 'on'
         
         try:
-            Sala.objects.create(
+            sala = Sala.objects.create(
+                sede=sede_del_staff(request),
                 nombre=nombre,
                 capacidad_maxima=capacidad,
                 estado=estado,
                 habilitada=habilitada
             )
+            registrar_evento(_actor(request), 'crear_sala', sala, despues=datos_sala(sala))
             messages.success(request, f'Sala "{nombre}" creada exitosamente!')
             return redirect('reservas:gestion_salas')
         except Exception as e:
@@ -272,14 +334,16 @@ def editar_sala(request, sala_id):
     """
     Vista para editar una sala existente
     """
-    sala = get_object_or_404(Sala, id=sala_id)
+    sala = get_object_or_404(Sala, id=sala_id, sede=sede_del_staff(request))
     
     if request.method == 'POST':
+        antes = datos_sala(sala)
         sala.nombre = request.POST.get('nombre')
         sala.capacidad_maxima = request.POST.get('capacidad_maxima')
         sala.estado = request.POST.get('estado')
         sala.habilitada = request.POST.get('habilitada') == 'on'
         sala.save()
+        registrar_evento(_actor(request), 'editar_sala', sala, antes=antes, despues=datos_sala(sala))
         
         messages.success(request, f'Sala "{sala.nombre}" actualizada exitosamente!')
         return redirect('reservas:gestion_salas')
@@ -296,7 +360,7 @@ def eliminar_sala(request, sala_id):
     """
     Vista para eliminar una sala
     """
-    sala = get_object_or_404(Sala, id=sala_id)
+    sala = get_object_or_404(Sala, id=sala_id, sede=sede_del_staff(request))
     nombre_sala = sala.nombre
     
     # Verificar que no tenga reservas activas
@@ -304,6 +368,7 @@ def eliminar_sala(request, sala_id):
     if reservas_activas:
         messages.error(request, f'No se puede eliminar la sala "{nombre_sala}" porque tiene reservas asociadas.')
     else:
+        registrar_evento(_actor(request), 'eliminar_sala', sala, antes=datos_sala(sala))
         sala.delete()
         messages.success(request, f'Sala "{nombre_sala}" eliminada exitosamente!')
     
@@ -317,9 +382,9 @@ def gestion_reservas(request):
     """
     # Filtros
     filtro_estado = request.GET.get('estado', 'todas')
-    hoy = timezone.now().date()
     
-    reservas = Reserva.objects.all().select_related('sala').order_by('-fecha_hora_inicio')
+    sede = sede_del_staff(request)
+    reservas = Reserva.objects.filter(sede=sede).select_related('sala').order_by('-fecha_hora_inicio')
     
     # Aplicar filtros
     if filtro_estado == 'activas':
@@ -327,11 +392,13 @@ def gestion_reservas(request):
     elif filtro_estado == 'completadas':
         reservas = reservas.filter(fecha_hora_termino__lte=timezone.now())
     elif filtro_estado == 'hoy':
-        reservas = reservas.filter(fecha_hora_inicio__date=hoy)
+        inicio_dia, fin_dia = _rango_del_dia(timezone.localdate())
+        reservas = reservas.filter(fecha_hora_inicio__gte=inicio_dia, fecha_hora_inicio__lt=fin_dia)
     
     context = {
         'reservas': reservas,
         'filtro_actual': filtro_estado,
+        'sede': sede,
         'usuario_actual': request.user,
         'now': timezone.now(),
     }
@@ -343,7 +410,8 @@ def crear_reserva_manual(request):
     """
     Vista para crear reserva manualmente
     """
-    salas = Sala.objects.filter(habilitada=True, estado='disponible')
+    sede = sede_del_staff(request)
+    salas = Sala.objects.filter(sede=sede, habilitada=True, estado='disponible')
     
     if request.method == 'POST':
         rut = request.POST.get('rut_reservante')
@@ -352,29 +420,34 @@ def crear_reserva_manual(request):
         fecha_termino = request.POST.get('fecha_hora_termino')
         
         try:
-            sala = Sala.objects.get(id=sala_id)
-            
             # Convertir strings a datetime
-            from datetime import datetime
             fecha_inicio_dt = datetime.fromisoformat(fecha_inicio.replace('Z', '+00:00'))
             fecha_termino_dt = datetime.fromisoformat(fecha_termino.replace('Z', '+00:00'))
             
-            # Verificar disponibilidad
-            reserva_conflicto = Reserva.objects.filter(
-                sala=sala,
-                fecha_hora_inicio__lt=fecha_termino_dt,
-                fecha_hora_termino__gt=fecha_inicio_dt
-            ).exists()
+            with transaction.atomic():
+                # Mismo bloqueo que el confirmador de reservas en lotes
+                sala = Sala.objects.bloquear().get(id=sala_id, sede=sede)
+                
+                # Verificar disponibilidad
+                reserva_conflicto = Reserva.objects.filter(
+                    sala=sala,
+                    fecha_hora_inicio__lt=fecha_termino_dt,
+                    fecha_hora_termino__gt=fecha_inicio_dt
+                ).exists()
+                
+                reserva = None
+                if not reserva_conflicto:
+                    reserva = Reserva.objects.create(
+                        rut_reservante=rut,
+                        sala=sala,
+                        fecha_hora_inicio=fecha_inicio_dt,
+                        fecha_hora_termino=fecha_termino_dt
+                    )
             
-            if reserva_conflicto:
+            if reserva is None:
                 messages.error(request, 'La sala no está disponible en ese horario.')
             else:
-                Reserva.objects.create(
-                    rut_reservante=rut,
-                    sala=sala,
-                    fecha_hora_inicio=fecha_inicio_dt,
-                    fecha_hora_termino=fecha_termino_dt
-                )
+                registrar_evento(_actor(request), 'crear_reserva', reserva, despues=datos_reserva(reserva))
                 messages.success(request, 'Reserva creada exitosamente!')
                 return redirect('reservas:gestion_reservas')
                 
@@ -393,9 +466,10 @@ def eliminar_reserva(request, reserva_id):
     """
     Vista para eliminar una reserva
     """
-    reserva = get_object_or_404(Reserva, id=reserva_id)
+    reserva = get_object_or_404(Reserva, id=reserva_id, sede=sede_del_staff(request))
     info_reserva = f"{reserva.sala.nombre} - {reserva.rut_reservante}"
     
+    registrar_evento(_actor(request), 'eliminar_reserva', reserva, antes=datos_reserva(reserva))
     reserva.delete()
     messages.success(request, f'Reserva "{info_reserva}" eliminada exitosamente!')
     
@@ -407,7 +481,7 @@ def reducir_tiempo_reserva(request, reserva_id, minutos):
     """
     Reducir el tiempo de una reserva activa
     """
-    reserva = get_object_or_404(Reserva, id=reserva_id)
+    reserva = get_object_or_404(Reserva, id=reserva_id, sede=sede_del_staff(request))
     
     # Verificar que la reserva esté activa
     ahora = timezone.now()
@@ -415,6 +489,8 @@ def reducir_tiempo_reserva(request, reserva_id, minutos):
         messages.error(request, 'Esta reserva ya ha finalizado.')
         return redirect('reservas:gestion_reservas')
     
+    antes = datos_reserva(reserva)
+    
     # Calcular nueva hora de término
     nueva_hora_termino = reserva.fecha_hora_termino - timedelta(minutes=minutos)
     
@@ -430,16 +506,20 @@ def reducir_tiempo_reserva(request, reserva_id, minutos):
         reserva.duracion_minutos = int(nueva_duracion)
         mensaje = f'Tiempo reducido en {minutos} minutos. Nueva hora de término: {reserva.fecha_hora_termino.strftime("%H:%M")}'
     
+    reserva.finalizada_antes = True
     reserva.save()
+    registrar_evento(_actor(request), 'reducir_reserva', reserva, antes=antes, despues=datos_reserva(reserva))
     messages.success(request, mensaje)
     
     return redirect('reservas:gestion_reservas')
 
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
 def finalizar_reserva_ahora(request, reserva_id):
     """
     Finalizar una reserva inmediatamente
     """
-    reserva = get_object_or_404(Reserva, id=reserva_id)
+    reserva = get_object_or_404(Reserva, id=reserva_id, sede=sede_del_staff(request))
     
     # Verificar que la reserva esté activa
     ahora = timezone.now()
@@ -448,9 +528,269 @@ def finalizar_reserva_ahora(request, reserva_id):
         return redirect('reservas:gestion_reservas')
     
     sala_nombre = reserva.sala.nombre
+    antes = datos_reserva(reserva)
     reserva.fecha_hora_termino = ahora
+    reserva.finalizada_antes = True
     reserva.save()
+    registrar_evento(_actor(request), 'finalizar_reserva', reserva, antes=antes, despues=datos_reserva(reserva))
     
     messages.success(request, f'Reserva de {sala_nombre} finalizada inmediatamente. Sala ahora disponible.')
     
-    return redirect('reservas:gestion_reservas')
\ No newline at end of file
+    return redirect('reservas:gestion_reservas')
+
+def _version_calendario(request, sala_id=None, sede_slug=None):
+    """
+    Versión del feed: cambia con las reservas y también cada día, cuando la
+    ventana publicada avanza
+    """
+    if hasattr(request, '_version_calendario'):
+        return request._version_calendario
+    if sala_id is not None:
+        sello, modificado = obtener_version(sala_id=sala_id)
+    else:
+        sede = sede_de_feed(sede_slug)
+        sello, modificado = obtener_version(sede_id=sede.id if sede else None)
+    hoy = timezone.localdate()
+    inicio_ventana = timezone.make_aware(datetime.combine(hoy, time.min))
+    request._version_calendario = (f'{sello}-{hoy.isoformat()}', max(modificado, inicio_ventana))
+    return request._version_calendario
+
+def _etag_calendario(request, **kwargs):
+    return _version_calendario(request, **kwargs)[0]
+
+def _modificacion_calendario(request, **kwargs):
+    return _version_calendario(request, **kwargs)[1]
+
+@condition(etag_func=_etag_calendario, last_modified_func=_modificacion_calendario)
+def calendario_sala(request, sala_id):
+    """
+    Feed iCalendar de las reservas de una sala
+    """
+    sala = get_object_or_404(Sala, id=sala_id)
+    contenido = generar_ical(sala.nombre, reservas_en_ventana(sala))
+    response = StreamingHttpResponse(contenido, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="sala-{sala.id}.ics"'
+    return response
+
+@condition(etag_func=_etag_calendario, last_modified_func=_modificacion_calendario)
+def calendario_salas(request, sede_slug=None):
+    """
+    Feed iCalendar con las reservas de todas las salas de una sede
+    """
+    sede = sede_de_feed(sede_slug)
+    contenido = generar_ical(f'Salas de Estudio - {sede}', reservas_en_ventana(sede=sede))
+    response = StreamingHttpResponse(contenido, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="salas-{sede.slug}.ics"'
+    return response
+
+
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
+def registro_auditoria(request):
+    """
+    Registro de auditoría con paginación por clave (id descendente)
+    """
+    por_pagina = 50
+    sede = sede_del_staff(request)
+    registros = RegistroAuditoria.objects.filter(sede=sede).order_by('-id')
+    
+    filtro_accion = request.GET.get('accion', '')
+    if filtro_accion:
+        registros = registros.filter(accion=filtro_accion)
+    
+    antes_de = request.GET.get('antes')
+    if antes_de and antes_de.isdigit():
+        registros = registros.filter(id__lt=int(antes_de))
+    
+    # Se pide un registro extra para saber si hay una página siguiente
+    pagina = list(registros[:por_pagina + 1])
+    siguiente = pagina[por_pagina - 1].id if len(pagina) > por_pagina else None
+    
+    context = {
+        'registros': pagina[:por_pagina],
+        'siguiente': siguiente,
+        'filtro_accion': filtro_accion,
+        'acciones': RegistroAuditoria.ACCIONES,
+        'metricas': escritor.metricas(),
+        'sede': sede,
+        'usuario_actual': request.user,
+    }
+    return render(request, 'registro_auditoria.html', context)
+
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
+def metricas_auditoria(request):
+    """
+    Estado de la cola de auditoría (profundidad, descartes, escritos)
+    """
+    return JsonResponse(escritor.metricas())
+
+
+def _pronostico_sala(sala_id):
+    from .pronostico import obtener_pronostico
+    return obtener_pronostico(sala_id)
+
+def disponibilidad_probable(request, sala_id):
+    """
+    Probabilidad de que la sala esté libre en cada bloque de 15 minutos de un día de la semana
+    """
+    from .pronostico import DIAS_SEMANA, MINUTOS_BLOQUE
+    
+    sala = get_object_or_404(Sala, id=sala_id, habilitada=True)
+    dia = request.GET.get('dia', '')
+    dia = int(dia) if dia.isdigit() and int(dia) < 7 else timezone.localdate().weekday()
+    
+    pronostico = _pronostico_sala(sala.id)
+    bloques_por_hora = 60 // MINUTOS_BLOQUE
+    libre = 1 - pronostico['matriz'][dia]
+    horas = [
+        {
+            'hora': hora,
+            'bloques': [
+                {'minuto': b * MINUTOS_BLOQUE, 'porcentaje': int(round(libre[hora * bloques_por_hora + b] * 100))}
+                for b in range(bloques_por_hora)
+            ],
+        }
+        for hora in range(24)
+    ]
+    
+    context = {
+        'sala': sala,
+        'dia': dia,
+        'dias_semana': list(enumerate(DIAS_SEMANA)),
+        'horas': horas,
+        'calculado': pronostico['calculado'],
+        'semanas': pronostico['semanas'],
+    }
+    return render(request, 'disponibilidad_probable.html', context)
+
+def api_pronostico_sala(request, sala_id):
+    """
+    API: probabilidad de que la sala esté libre, completa o para ?dia=0-6&hora=HH:MM
+    """
+    from .pronostico import MINUTOS_BLOQUE, bloque_de_hora
+    
+    sala = get_object_or_404(Sala, id=sala_id, habilitada=True)
+    pronostico = _pronostico_sala(sala.id)
+    libre = 1 - pronostico['matriz']
+    datos = {
+        'sala': sala.id,
+        'minutos_bloque': MINUTOS_BLOQUE,
+        'calculado': pronostico['calculado'].isoformat(),
+        'semanas_historial': pronostico['semanas'],
+    }
+    
+    dia = request.GET.get('dia')
+    hora = request.GET.get('hora')
+    if dia is not None and hora is not None:
+        try:
+            dia = int(dia)
+            horas, minutos = (int(parte) for parte in hora.split(':'))
+            if not (0 <= dia < 7 and 0 <= horas < 24 and 0 <= minutos < 60):
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'error': 'Parámetros inválidos: dia=0-6, hora=HH:MM'}, status=400)
+        datos.update({'dia': dia, 'hora': hora, 'probabilidad_libre': round(float(libre[dia, bloque_de_hora(horas, minutos)]), 3)})
+    else:
+        datos['probabilidad_libre'] = libre.round(3).tolist()
+    
+    return JsonResponse(datos)
+
+
+def _fechas_en_conflicto(conflictos):
+    return ', '.join(timezone.localtime(inicio).strftime('%d/%m %H:%M') for inicio, _ in conflictos)
+
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
+def gestion_series(request):
+    """
+    Listado de series de reservas recurrentes de la sede
+    """
+    sede = sede_del_staff(request)
+    lista_series = SerieReserva.objects.filter(sede=sede).select_related('sala').order_by('-activa', 'sala__nombre', 'hora_inicio')
+    
+    context = {
+        'series': lista_series,
+        'sede': sede,
+        'usuario_actual': request.user,
+    }
+    return render(request, 'gestion_series.html', context)
+
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
+def crear_serie(request):
+    """
+    Crear una serie semanal o diaria; las sesiones que chocan con reservas existentes se informan y se omiten
+    """
+    sede = sede_del_staff(request)
+    salas = Sala.objects.filter(sede=sede, habilitada=True, estado='disponible').order_by('nombre')
+    
+    if request.method == 'POST':
+        form = SerieReservaForm(request.POST, salas=salas)
+        if form.is_valid():
+            serie = form.save(commit=False)
+            creadas, conflictos = series.crear_serie(serie)
+            registrar_evento(_actor(request), 'crear_serie', serie, despues=datos_serie(serie))
+            
+            messages.success(request, f'Serie creada con {creadas} sesiones en {serie.sala.nombre}.')
+            if conflictos:
+                messages.warning(request, f'{len(conflictos)} sesiones no se crearon por conflicto con otras reservas y quedaron como excepciones: {_fechas_en_conflicto(conflictos)}')
+            return redirect('reservas:gestion_series')
+    else:
+        form = SerieReservaForm(salas=salas)
+    
+    context = {
+        'form': form,
+        'usuario_actual': request.user,
+    }
+    return render(request, 'form_serie.html', context)
+
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
+def editar_serie(request, serie_id):
+    """
+    Editar horario, duración, término o excepciones de las sesiones futuras de una serie
+    """
+    serie = get_object_or_404(SerieReserva, id=serie_id, sede=sede_del_staff(request), activa=True)
+    antes = datos_serie(serie)
+    conflictos = []
+    
+    if request.method == 'POST':
+        form = SerieReservaForm(request.POST, instance=serie)
+    else:
+        form = SerieReservaForm(instance=serie)
+    for campo in ('sala', 'rut_reservante', 'frecuencia', 'fecha_inicio'):
+        form.fields[campo].disabled = True
+    
+    if request.method == 'POST' and form.is_valid():
+        datos = form.cleaned_data
+        creadas, conflictos = series.editar_serie(
+            serie, datos['hora_inicio'], datos['duracion_minutos'], datos['fecha_fin'], datos['excepciones']
+        )
+        if not conflictos:
+            registrar_evento(_actor(request), 'editar_serie', serie, antes=antes, despues=datos_serie(serie))
+            messages.success(request, 'Serie actualizada exitosamente!')
+            return redirect('reservas:gestion_series')
+        messages.error(request, 'El nuevo horario choca con otras reservas. No se modificó la serie.')
+    
+    context = {
+        'form': form,
+        'serie': serie,
+        'conflictos': conflictos,
+        'usuario_actual': request.user,
+    }
+    return render(request, 'form_serie.html', context)
+
+@login_required
+@user_passes_test(es_staff, login_url='/administracion/login/')
+def cancelar_serie(request, serie_id):
+    """
+    Cancelar una serie eliminando sus sesiones futuras
+    """
+    serie = get_object_or_404(SerieReserva, id=serie_id, sede=sede_del_staff(request), activa=True)
+    antes = datos_serie(serie)
+    eliminadas = series.cancelar_serie(serie)
+    registrar_evento(_actor(request), 'cancelar_serie', serie, antes=antes, despues=datos_serie(serie))
+    
+    messages.success(request, f'Serie cancelada: {eliminadas} sesiones futuras eliminadas.')
+    return redirect('reservas:gestion_series')